@@ -56,19 +56,67 @@ def get_secret(secret_id: str, default: str = "") -> str:
 class Settings(BaseSettings):
     """Settings"""
 
+    AUTH_CACHE_SIZE: int = 1024  # Usuarios autentificados guardados por proceso
+    AUTH_CACHE_TTL: int = 60  # Segundos que se guarda un usuario autentificado, con cero no se guarda
+    AUTH_CLIENT_IP_HEADER: str = ""  # Encabezado con la IP del cliente que pone el proxy, en App Engine X-Appengine-User-IP
+    AUTH_FAILURES_WINDOW: int = 60  # Segundos de la ventana en la que se cuentan las fallas por origen
+    AUTH_MAX_FAILURES: int = 0  # Fallas por origen en la ventana antes de rechazar, con cero no se bloquea, ver README
+    AUTH_REJECT_CACHE_SIZE: int = 4096  # Api_keys rechazadas y orígenes con fallas guardados por proceso
+    AUTH_REJECT_CACHE_TTL: int = 30  # Segundos que se recuerda una api_key rechazada, con cero no se guarda
+    BATCH_CONCURRENCY: int = 4  # Solicitudes de un lote que se ejecutan a la vez, cada una ocupa una conexión
+    BATCH_MAX_REQUESTS: int = 20  # Solicitudes que se pueden pedir en un lote
+    BLOB_CACHE_MAX_BYTES: int = 67108864  # Bytes de los archivos guardados, en App Engine /tmp ocupa memoria
+    BLOB_CACHE_PATH: str = ""  # Directorio de los archivos guardados, si está vacío no se guardan
+    BLOB_CHUNK_SIZE: int = 1048576  # Bytes que se descargan del depósito en cada bloque al entregar un archivo
+    CAMBIOS_SETTLE_SECONDS: int = 60  # Segundos recientes que no entregan los cambios, dan tiempo a confirmar las transacciones
+    CATALOG_CACHE_PROBE_INTERVAL: int = 5  # Segundos entre cada consulta de max(modificado) de una tabla
+    CATALOG_CACHE_SIZE: int = 512  # Respuestas de catálogos guardadas por proceso
+    CATALOG_CACHE_TTL: int = 300  # Segundos que se guarda una respuesta de catálogo, con cero no se guarda
+    COMPRESSION_ENABLED: bool = True  # Comprimir las respuestas según Accept-Encoding
+    COMPRESSION_LEVEL_BROTLI: int = 5  # De 0 a 11
+    COMPRESSION_LEVEL_GZIP: int = 6  # De 1 a 9
+    COMPRESSION_LEVEL_ZSTD: int = 3  # De 1 a 22
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes a partir de los cuales se comprime
     DB_HOST: str = get_secret("db_host")
     DB_PORT: int = int(get_secret("db_port"))
     DB_NAME: str = get_secret("db_name")
     DB_PASS: str = get_secret("db_pass")
     DB_USER: str = get_secret("db_user")
+    DB_POOL_SIZE: int = 5  # Conexiones que se mantienen abiertas por proceso
+    DB_POOL_MAX_OVERFLOW: int = 10  # Conexiones adicionales permitidas en picos
+    DB_POOL_RECYCLE: int = 1800  # Segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True  # Verificar la conexión antes de usarla
+    DB_POOL_TIMEOUT: int = 30  # Segundos de espera por una conexión libre
+    DB_REPLICA_HOST: str = get_secret("db_replica_host")  # Si está vacío, todas las consultas van al primario
+    DB_REPLICA_PORT: int = int(get_secret("db_replica_port", "5432"))
+    DB_REPLICA_MAX_LAG: int = 30  # Segundos de retraso tolerados antes de regresar al primario
+    DB_REPLICA_LAG_CHECK_INTERVAL: int = 10  # Segundos entre cada medición del retraso
     ESTADO_CLAVE: str = get_secret("estado_clave", "05")  # Por defecto es Coahuila de Zaragoza
+    EXPORT_MAX_DAYS: int = 366  # Días que puede abarcar el rango de fechas de una descarga
+    EXPORT_YIELD_PER: int = 1000  # Filas que se traen del cursor del servidor en cada bloque de una descarga
+    FAST_JSON_RESPONSES: bool = True  # Serializar con model_dump_json los esquemas que regresan los endpoints
     GCP_BUCKET: str = get_secret("gcp_bucket")
     GCP_BUCKET_EDICTOS: str = get_secret("gcp_bucket_edictos")
     GCP_BUCKET_GLOSAS: str = get_secret("gcp_bucket_glosas")
     GCP_BUCKET_LISTAS_DE_ACUERDOS: str = get_secret("gcp_bucket_listas_de_acuerdos")
     GCP_BUCKET_SENTENCIAS: str = get_secret("gcp_bucket_sentencias")
+    LOTE_MAX_IDS: int = 100  # IDs que se pueden pedir en un lote
     ORIGINS: str = get_secret("origins")
+    PAGINATION_COUNT_CACHE_SIZE: int = 1024  # Totales guardados por proceso
+    PAGINATION_COUNT_CACHE_TTL: int = 300  # Segundos que se guarda un total contado
+    RATE_LIMIT_ENABLED: bool = True  # Limitar las solicitudes por api_key
+    RATE_LIMIT_MAX_KEYS: int = 10000  # Cubetas guardadas en memoria por proceso
+    RATE_LIMIT_REDIS_PREFIX: str = "pjecz_hercules_api_key:rate_limit"
+    RATE_LIMIT_REDIS_URL: str = get_secret("rate_limit_redis_url")  # Si está vacío, cada proceso guarda sus cubetas
+    RATE_LIMIT_TIERS: dict = {  # Solicitudes por segundo, ráfaga y solicitudes simultáneas de cada nivel
+        "default": {"rate": 20, "burst": 40, "concurrency": 8},
+        "alto": {"rate": 100, "burst": 200, "concurrency": 32},
+    }
+    RATE_LIMIT_USERS: dict = {}  # Nivel de cada usuario por su email, los demás usan default
     SALT: str = get_secret("salt")
+    SIGNED_URL_TTL: int = 300  # Segundos que sirve una URL firmada de un archivo del depósito
+    STORAGE_LOCAL_PATH: str = ""  # Directorio con los archivos de los depósitos, si está vacío se usa Google Cloud Storage
+    STORAGE_POOL_SIZE: int = 20  # Conexiones HTTP al depósito que se mantienen abiertas por proceso
     TZ: str = "America/Mexico_City"
 
     class Config:
@@ -2,32 +2,204 @@
 Authentications
 """
 
+import hashlib
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security.api_key import APIKeyHeader
 from hashids import Hashids
-from sqlalchemy.orm import Session
-from starlette.status import HTTP_403_FORBIDDEN
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_429_TOO_MANY_REQUESTS
 from unidecode import unidecode
 
+from ..config.settings import get_settings
+from ..models.modulos import Modulo
+from ..models.permisos import Permiso
+from ..models.roles import Rol
 from ..models.usuarios import Usuario
+from ..models.usuarios_roles import UsuarioRol
 from ..schemas.usuarios import UsuarioInDB
-from .database import get_db
+from .batch_requests import USUARIO_LOTE
+from .database import get_async_db
 from .exceptions import MyAuthenticationError
+from .rate_limits import CONCURRENCIA_POR_LIBERAR, acquire_concurrency, check_rate_limit, get_tier, release_concurrency
 
 API_KEY_REGEXP = r"^\w+\.\w+\.\w+$"
 X_API_KEY = APIKeyHeader(name="X-Api-Key")
 
+# Usuarios autentificados por api_key, cada valor es (expiración, usuario)
+usuarios_cache: OrderedDict[str, tuple[float, UsuarioInDB]] = OrderedDict()
+usuarios_cache_stats = {"hits": 0, "misses": 0}
 
-def get_user(
+# Api_keys rechazadas, la llave es el hash del api_key y cada valor es (expiración, motivo)
+rechazos_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+# Fallas por origen, cada valor es (inicio de la ventana, cantidad de fallas)
+fallas_por_origen: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+# Cantidad de rechazos por motivo y de rechazos que no consultaron la base de datos
+rechazos_stats = {"motivos": {}, "cache_hits": 0, "origen_bloqueado": 0}
+
+ORIGEN_BLOQUEADO = "Demasiados intentos fallidos desde este origen"
+
+
+def get_cached_user(api_key: str) -> Optional[UsuarioInDB]:
+    """Entregar el usuario guardado para el api_key si no ha expirado la entrada ni el api_key"""
+    if api_key not in usuarios_cache:
+        usuarios_cache_stats["misses"] += 1
+        return None
+    expiracion, usuario = usuarios_cache[api_key]
+    if expiracion < time.monotonic() or usuario.api_key_expiracion < datetime.now():
+        del usuarios_cache[api_key]
+        usuarios_cache_stats["misses"] += 1
+        return None
+    usuarios_cache.move_to_end(api_key)
+    usuarios_cache_stats["hits"] += 1
+    return usuario
+
+
+def set_cached_user(usuario: UsuarioInDB) -> None:
+    """Guardar el usuario autentificado por un tiempo, se descartan los menos usados"""
+    settings = get_settings()
+    if settings.AUTH_CACHE_TTL <= 0:
+        return
+    usuarios_cache[usuario.api_key] = (time.monotonic() + settings.AUTH_CACHE_TTL, usuario)
+    usuarios_cache.move_to_end(usuario.api_key)
+    while len(usuarios_cache) > settings.AUTH_CACHE_SIZE:
+        usuarios_cache.popitem(last=False)
+
+
+def invalidate_cached_user(api_key: Optional[str] = None, email: Optional[str] = None) -> None:
+    """Descartar del cache un api_key, los de un usuario por su email o, sin parámetros, todo el cache"""
+    if api_key is None and email is None:
+        usuarios_cache.clear()
+        rechazos_cache.clear()
+        return
+    if api_key is not None:
+        rechazos_cache.pop(hash_api_key(api_key), None)
+    for llave in [llave for llave, (_, usuario) in usuarios_cache.items() if llave == api_key or usuario.email == email]:
+        del usuarios_cache[llave]
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash del api_key para no guardar en memoria las api_keys rechazadas"""
+    return hashlib.sha256(api_key.encode("utf-8", errors="replace")).hexdigest()
+
+
+def get_cached_rejection(api_key: str) -> Optional[str]:
+    """Entregar el motivo si el api_key fue rechazada hace poco"""
+    llave = hash_api_key(api_key)
+    if llave not in rechazos_cache:
+        return None
+    expiracion, motivo = rechazos_cache[llave]
+    if expiracion < time.monotonic():
+        del rechazos_cache[llave]
+        return None
+    return motivo
+
+
+def set_cached_rejection(api_key: str, motivo: str) -> None:
+    """Guardar el api_key rechazada por un tiempo, se descartan las más antiguas"""
+    settings = get_settings()
+    if settings.AUTH_REJECT_CACHE_TTL <= 0:
+        return
+    llave = hash_api_key(api_key)
+    rechazos_cache[llave] = (time.monotonic() + settings.AUTH_REJECT_CACHE_TTL, motivo)
+    rechazos_cache.move_to_end(llave)
+    while len(rechazos_cache) > settings.AUTH_REJECT_CACHE_SIZE:
+        rechazos_cache.popitem(last=False)
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    IP del cliente para contar las fallas por origen
+
+    Detrás de un proxy la conexión viene del proxy, no del cliente. Se toma el encabezado AUTH_CLIENT_IP_HEADER
+    que pone el proxy de confianza, en App Engine es X-Appengine-User-IP, que no puede enviar el cliente.
+    """
+    encabezado = get_settings().AUTH_CLIENT_IP_HEADER
+    if encabezado != "" and request.headers.get(encabezado):
+        return request.headers[encabezado].strip()
+    return request.client.host if request.client else ""
+
+
+def is_source_blocked(origen: str) -> bool:
+    """¿El origen superó la cantidad de fallas permitidas en la ventana de tiempo?"""
+    settings = get_settings()
+    if settings.AUTH_MAX_FAILURES <= 0 or origen == "" or origen not in fallas_por_origen:
+        return False
+    inicio, fallas = fallas_por_origen[origen]
+    if inicio + settings.AUTH_FAILURES_WINDOW < time.monotonic():
+        del fallas_por_origen[origen]
+        return False
+    return fallas >= settings.AUTH_MAX_FAILURES
+
+
+def record_source_failure(origen: str) -> None:
+    """Contar una falla del origen en la ventana de tiempo vigente, sin origen conocido no se cuenta"""
+    settings = get_settings()
+    if settings.AUTH_MAX_FAILURES <= 0 or origen == "":
+        return
+    ahora = time.monotonic()
+    inicio, fallas = fallas_por_origen.get(origen, (ahora, 0))
+    if inicio + settings.AUTH_FAILURES_WINDOW < ahora:
+        inicio, fallas = ahora, 0
+    fallas_por_origen[origen] = (inicio, fallas + 1)
+    fallas_por_origen.move_to_end(origen)
+    while len(fallas_por_origen) > settings.AUTH_REJECT_CACHE_SIZE:
+        fallas_por_origen.popitem(last=False)
+
+
+def get_auth_rejection_stats() -> dict:
+    """Estadísticas de los rechazos de autentificación"""
+    return {
+        "motivos": dict(rechazos_stats["motivos"]),
+        "cache_hits": rechazos_stats["cache_hits"],
+        "cache_size": len(rechazos_cache),
+        "origen_bloqueado": rechazos_stats["origen_bloqueado"],
+        "origenes_con_fallas": len(fallas_por_origen),
+    }
+
+
+def get_user_cache_stats() -> dict:
+    """Estadísticas del cache de usuarios autentificados"""
+    return {
+        "size": len(usuarios_cache),
+        "hits": usuarios_cache_stats["hits"],
+        "misses": usuarios_cache_stats["misses"],
+    }
+
+
+async def get_user_permissions(
     usuario_id: int,
-    database: Session = Depends(get_db),
+    database: AsyncSession,
+) -> dict:
+    """Consultar en una sola consulta el nivel máximo de los permisos activos del usuario por módulo"""
+    consulta = (
+        select(Modulo.nombre, func.max(Permiso.nivel))
+        .select_from(UsuarioRol)
+        .join(Rol, Rol.id == UsuarioRol.rol_id)
+        .join(Permiso, Permiso.rol_id == Rol.id)
+        .join(Modulo, Modulo.id == Permiso.modulo_id)
+        .filter(UsuarioRol.usuario_id == usuario_id)
+        .filter(UsuarioRol.estatus == "A")
+        .filter(Permiso.estatus == "A")
+        .group_by(Modulo.nombre)
+    )
+    return {modulo_nombre: nivel for modulo_nombre, nivel in (await database.execute(consulta)).all()}
+
+
+async def get_user(
+    usuario_id: int,
+    database: AsyncSession = Depends(get_async_db),
 ) -> Optional[UsuarioInDB]:
     """Consultar un usuario por su id"""
-    usuario = database.query(Usuario).get(usuario_id)
+    usuario = await database.get(Usuario, usuario_id)
     if usuario:
         return UsuarioInDB(
             id=usuario.id,
@@ -37,7 +209,7 @@ def get_user(
             apellido_materno=usuario.apellido_materno,
             puesto=usuario.puesto,
             username=usuario.email,
-            permissions=usuario.permissions,
+            permissions=await get_user_permissions(usuario.id, database),
             hashed_password=usuario.contrasena,
             disabled=usuario.estatus != "A",
             api_key=usuario.api_key,
@@ -46,17 +218,34 @@ def get_user(
     return None
 
 
-def authenticate_user(
+async def authenticate_user(
     api_key: str,
-    database: Session,
+    database: AsyncSession,
+    origen: str = "",
 ) -> UsuarioInDB:
     """Autentificar un usuario por su api_key"""
 
+    # Si esta api_key fue rechazada hace poco, rechazarla con el mismo motivo sin consultar la base de datos
+    motivo = get_cached_rejection(api_key)
+    if motivo is not None:
+        rechazos_stats["cache_hits"] += 1
+        raise MyAuthenticationError(motivo)
+
     # Validar con expresión regular
     api_key = unidecode(api_key)
     if re.match(API_KEY_REGEXP, api_key) is None:
         raise MyAuthenticationError("No paso la validacion por expresion regular")
 
+    # Si ya se autentificó este api_key hace poco, entregar el usuario guardado
+    usuario = get_cached_user(api_key)
+    if usuario is not None:
+        return usuario
+
+    # Si el origen tiene demasiadas fallas, rechazar sin consultar la base de datos
+    if is_source_blocked(origen):
+        rechazos_stats["origen_bloqueado"] += 1
+        raise MyAuthenticationError(ORIGEN_BLOQUEADO)
+
     # Separar el ID, el email y la cadena aleatoria del api_key
     api_key_id, api_key_email, _ = api_key.split(".")
 
@@ -66,7 +255,7 @@ def authenticate_user(
         raise MyAuthenticationError("No se pudo descifrar el ID")
 
     # Consultar
-    usuario = get_user(usuario_id, database)
+    usuario = await get_user(usuario_id, database)
     if usuario is None:
         raise MyAuthenticationError("No se encontro el usuario")
 
@@ -86,21 +275,65 @@ def authenticate_user(
     if usuario.disabled:
         raise MyAuthenticationError("No es activo este usuario porque fue eliminado")
 
-    # Entregar
+    # Guardar y entregar
+    set_cached_user(usuario)
     return usuario
 
 
 async def get_current_active_user(
+    request: Request,
     api_key: str = Depends(X_API_KEY),
-    database: Session = Depends(get_db),
+    database: AsyncSession = Depends(get_async_db),
 ) -> UsuarioInDB:
-    """Obtener el usuario activo actual"""
+    """Obtener el usuario activo actual, limitando sus solicitudes por segundo y simultáneas"""
+    # Las solicitudes de un lote ya vienen con el usuario autentificado y limitado
+    if USUARIO_LOTE in request.scope:
+        yield request.scope[USUARIO_LOTE]
+        return
+
+    origen = get_client_ip(request)
 
     # Try-except
     try:
-        usuario = authenticate_user(api_key, database)
+        usuario = await authenticate_user(api_key, database, origen)
     except MyAuthenticationError as error:
-        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail=str(error)) from error
+        motivo = str(error)
+        rechazos_stats["motivos"][motivo] = rechazos_stats["motivos"].get(motivo, 0) + 1
+        if motivo != ORIGEN_BLOQUEADO:
+            set_cached_rejection(api_key, motivo)
+            record_source_failure(origen)
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail=motivo) from error
 
-    # Entregar
-    return usuario
+    # Si no se limita este usuario, entregar
+    tier = get_tier(usuario.email)
+    if tier is None:
+        yield usuario
+        return
+
+    # Tomar una ficha de la cubeta del api_key
+    llave = hash_api_key(usuario.api_key)
+    segundos = await check_rate_limit(llave, tier)
+    if segundos is not None:
+        raise HTTPException(
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas solicitudes por segundo",
+            headers={"Retry-After": str(segundos)},
+        )
+
+    # Ocupar un lugar de las solicitudes simultáneas mientras se atiende la solicitud
+    if not await acquire_concurrency(llave, tier):
+        raise HTTPException(
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas solicitudes simultáneas",
+            headers={"Retry-After": "1"},
+        )
+
+    # Con el middleware se libera al terminar de enviar la respuesta, si no está se libera al cerrar la dependencia
+    if CONCURRENCIA_POR_LIBERAR in request.scope:
+        request.scope[CONCURRENCIA_POR_LIBERAR].append(llave)
+        yield usuario
+        return
+    try:
+        yield usuario
+    finally:
+        await release_concurrency(llave)
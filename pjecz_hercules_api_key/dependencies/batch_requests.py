@@ -0,0 +1,109 @@
+"""
+Batch Requests
+
+Ejecutar solicitudes GET dentro del mismo proceso, sin otra conexión HTTP. El usuario ya autentificado
+viaja en el scope de cada solicitud para que get_current_active_user no lo vuelva a consultar ni a limitar.
+"""
+
+import asyncio
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+import orjson
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+from ..schemas.usuarios import UsuarioInDB
+
+# Llave del scope con el usuario autentificado del lote
+USUARIO_LOTE = "pjecz_usuario_lote"
+
+# Encabezados de la solicitud del lote que se pasan a cada solicitud
+ENCABEZADOS = (b"x-api-key", b"user-agent", b"accept-language")
+
+
+def make_scope(request: Request, usuario: UsuarioInDB, path: str) -> Optional[dict]:
+    """Scope ASGI de la solicitud GET, es None si la ruta no es relativa"""
+    partes = urlsplit(path)
+    if partes.scheme != "" or partes.netloc != "" or not partes.path.startswith("/"):
+        return None
+    return {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": unquote(partes.path),
+        "raw_path": partes.path.encode("latin-1"),
+        "query_string": partes.query.encode("latin-1"),
+        "headers": [(llave, valor) for llave, valor in request.scope["headers"] if llave in ENCABEZADOS],
+        "state": dict(request.scope.get("state", {})),
+        USUARIO_LOTE: usuario,
+    }
+
+
+def find_route(request: Request, scope: dict) -> Optional[APIRoute]:
+    """Ruta GET de la API que atiende el scope, es None si no la hay o si no entrega un esquema en JSON"""
+    for ruta in request.app.router.routes:
+        if ruta.matches(scope)[0] == Match.FULL:
+            if isinstance(ruta, APIRoute) and ruta.response_model is not None:
+                return ruta
+            return None
+    return None
+
+
+async def run_request(request: Request, usuario: UsuarioInDB, path: str) -> dict:
+    """Ejecutar la solicitud GET y entregar su estado y su cuerpo JSON sin volver a decodificarlo"""
+    scope = make_scope(request, usuario, path)
+    if scope is None or find_route(request, scope) is None:
+        return {"path": path, "status_code": 404, "body": {"detail": "No es una ruta GET de la API"}}
+
+    # Recibir la respuesta, al terminar se avisa la desconexión por si la ruta la espera
+    terminado = asyncio.Event()
+    recibido = False
+    inicio = {"status": 500, "json": False}
+    partes = []
+
+    async def receive() -> dict:
+        nonlocal recibido
+        if not recibido:
+            recibido = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await terminado.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            inicio["status"] = message["status"]
+            encabezados = dict(message.get("headers", []))
+            inicio["json"] = encabezados.get(b"content-type", b"").startswith(b"application/json")
+        elif message["type"] == "http.response.body":
+            partes.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:  # La respuesta 500 ya quedó registrada por el middleware de errores
+        inicio["status"] = 500
+        inicio["json"] = False
+    finally:
+        terminado.set()
+
+    cuerpo = b"".join(partes)
+    if cuerpo == b"" or not inicio["json"]:
+        return {"path": path, "status_code": inicio["status"], "body": None}
+    return {"path": path, "status_code": inicio["status"], "body": orjson.Fragment(cuerpo)}
+
+
+async def run_batch(request: Request, usuario: UsuarioInDB, paths: list[str], simultaneas: int) -> list[dict]:
+    """Ejecutar las solicitudes, hasta simultaneas a la vez, cada una con su propia sesión de la base de datos"""
+    semaforo = asyncio.Semaphore(max(1, simultaneas))
+
+    async def ejecutar(path: str) -> dict:
+        async with semaforo:
+            return await run_request(request, usuario, path)
+
+    return list(await asyncio.gather(*[ejecutar(path) for path in paths]))
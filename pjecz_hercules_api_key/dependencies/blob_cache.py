@@ -0,0 +1,233 @@
+"""
+Blob Cache
+
+Archivos del depósito guardados en un directorio local con un límite de bytes, se descartan los usados hace más
+tiempo. La llave es el depósito, el nombre del blob y su generación, así una versión nueva nunca entrega la anterior.
+Si el archivo no está guardado se descarga una sola vez a un archivo temporal, la solicitud que lo pidió y las que
+lleguen mientras tanto lo leen conforme se escribe, así no se descarga el mismo archivo varias veces.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config.settings import get_settings
+from .cloud_storage import download
+
+# Prefijo de los archivos que se están descargando, no forman parte del cache
+PREFIJO_TEMPORAL = ".descarga-"
+
+
+class Descarga:
+    """Archivo que se está guardando en el cache, las solicitudes leen los bytes conforme se escriben"""
+
+    def __init__(self, destino: Path):
+        self.destino = destino
+        self.ruta: Optional[Path] = None
+        self.escrito = 0
+        self.activa = True
+        self.avance = asyncio.Event()
+        self.tarea: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """Despertar a las solicitudes que esperan más bytes"""
+        avance, self.avance = self.avance, asyncio.Event()
+        avance.set()
+
+    def open(self):
+        """Abrir el temporal para leerlo, si ya se renombró se abre el archivo guardado, se ejecuta en el threadpool"""
+        try:
+            return open(self.ruta, "rb")
+        except FileNotFoundError:
+            return open(self.destino, "rb")
+
+
+class BlobCache:
+    """Cache en disco con desalojo LRU, el orden de uso se guarda en la fecha de modificación de cada archivo"""
+
+    def __init__(self, path: str, max_bytes: int, chunk_size: int):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.entries = self.read_directory()
+        self.bytes = sum(self.entries.values())
+        self.pending: dict[str, Descarga] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "errors": 0}
+
+    def read_directory(self) -> OrderedDict[str, int]:
+        """Archivos del directorio del más antiguo al más reciente, lo comparten los procesos"""
+        archivos = []
+        for entrada in os.scandir(self.path):
+            if entrada.is_file() and not entrada.name.startswith(PREFIJO_TEMPORAL):
+                estado = entrada.stat()
+                archivos.append((estado.st_mtime_ns, entrada.name, estado.st_size))
+        archivos.sort()
+        return OrderedDict((nombre, tamanio) for _, nombre, tamanio in archivos)
+
+    @staticmethod
+    def make_key(deposito: str, blob) -> str:
+        """Llave del archivo con el depósito, el nombre y la generación del blob"""
+        return hashlib.sha256(f"{deposito}/{blob.name}#{blob.generation}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def touch(ruta: Path) -> int:
+        """Marcar el archivo como el más reciente y entregar su tamaño, se ejecuta en el threadpool"""
+        os.utime(ruta)
+        return ruta.stat().st_size
+
+    @staticmethod
+    def read(archivo, posicion: int, cantidad: int) -> bytes:
+        """Leer los bytes de un archivo abierto, se ejecuta en el threadpool"""
+        archivo.seek(posicion)
+        return archivo.read(cantidad)
+
+    @staticmethod
+    def write(archivo, bloque: bytes) -> None:
+        """Escribir el bloque y pasarlo al sistema para que lo lean las demás solicitudes, se ejecuta en el threadpool"""
+        archivo.write(bloque)
+        archivo.flush()
+
+    async def lookup(self, llave: str) -> Optional[Path]:
+        """Ruta del archivo guardado y marcarlo como el más reciente, otro proceso pudo haberlo guardado o descartado"""
+        ruta = self.path / llave
+        try:
+            tamanio = await run_in_threadpool(self.touch, ruta)
+        except FileNotFoundError:
+            self.bytes -= self.entries.pop(llave, 0)
+            return None
+        if llave not in self.entries:
+            self.entries[llave] = tamanio
+            self.bytes += tamanio
+        self.entries.move_to_end(llave)
+        return ruta
+
+    def remove(self, llaves: list[str]) -> None:
+        """Borrar los archivos descartados, se ejecuta en el threadpool"""
+        for llave in llaves:
+            try:
+                os.unlink(self.path / llave)
+            except FileNotFoundError:
+                pass
+
+    async def evict(self) -> None:
+        """Descartar los archivos usados hace más tiempo hasta quedar en el 90% del límite"""
+        if self.bytes <= self.max_bytes:
+            return
+        self.entries = await run_in_threadpool(self.read_directory)
+        self.bytes = sum(self.entries.values())
+        descartados = []
+        while self.entries and self.bytes > self.max_bytes * 0.9:
+            llave, tamanio = self.entries.popitem(last=False)
+            self.bytes -= tamanio
+            descartados.append(llave)
+        self.stats["evictions"] += len(descartados)
+        await run_in_threadpool(self.remove, descartados)
+
+    async def fill(self, llave: str, blob, descarga: Descarga) -> None:
+        """Descargar el archivo al temporal por bloques, renombrarlo al terminar y descartar los más antiguos"""
+        guardado = False
+        try:
+            descriptor, temporal = await run_in_threadpool(tempfile.mkstemp, dir=self.path, prefix=PREFIJO_TEMPORAL)
+            descarga.ruta = Path(temporal)
+            with os.fdopen(descriptor, "wb") as archivo:
+                for posicion in range(0, blob.size, self.chunk_size):
+                    fin = min(posicion + self.chunk_size, blob.size) - 1
+                    bloque = await run_in_threadpool(download, blob, posicion, fin)
+                    await run_in_threadpool(self.write, archivo, bloque)
+                    descarga.escrito += len(bloque)
+                    descarga.notify()
+            await run_in_threadpool(os.replace, descarga.ruta, descarga.destino)
+            guardado = True
+            self.bytes += blob.size - self.entries.pop(llave, 0)
+            self.entries[llave] = blob.size
+            await self.evict()
+        except Exception:
+            # Las solicitudes que lo leen piden al depósito lo que falte, la siguiente vuelve a intentar guardarlo
+            self.stats["errors"] += 1
+        finally:
+            if descarga.ruta is not None and not guardado:
+                await run_in_threadpool(self.remove_temporary, descarga.ruta)
+            del self.pending[llave]
+            descarga.activa = False
+            descarga.notify()
+
+    @staticmethod
+    def remove_temporary(ruta: Path) -> None:
+        """Borrar el temporal de una descarga que falló, se ejecuta en el threadpool"""
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            pass
+
+    async def follow(self, descarga: Descarga, blob, inicio: int, fin: int) -> AsyncIterator[bytes]:
+        """Bytes de inicio a fin conforme se escriben, si la descarga falla el resto se pide directo al depósito"""
+        posicion = inicio
+        archivo = None
+        try:
+            while posicion <= fin:
+                avance = descarga.avance
+                if descarga.escrito > posicion:
+                    cantidad = min(descarga.escrito, fin + 1, posicion + self.chunk_size) - posicion
+                    try:
+                        if archivo is None:
+                            archivo = await run_in_threadpool(descarga.open)
+                        bloque = await run_in_threadpool(self.read, archivo, posicion, cantidad)
+                    except OSError:
+                        break
+                    posicion += len(bloque)
+                    yield bloque
+                elif descarga.activa:
+                    await avance.wait()
+                else:
+                    break
+            for bloque_inicio in range(posicion, fin + 1, self.chunk_size):
+                yield await run_in_threadpool(download, blob, bloque_inicio, min(bloque_inicio + self.chunk_size, fin + 1) - 1)
+        finally:
+            if archivo is not None:
+                await run_in_threadpool(archivo.close)
+
+    async def fetch(self, deposito: str, blob) -> Optional[Path | Descarga]:
+        """
+        Ruta del archivo guardado o la descarga que lo está guardando, es None si el archivo no cabe en el cache
+
+        Si no está guardado ni se está descargando se empieza a descargar, una sola vez aunque lo pidan varias solicitudes.
+        """
+        if not blob.size or blob.size > self.max_bytes:
+            return None
+        llave = self.make_key(deposito, blob)
+        ruta = await self.lookup(llave)
+        if ruta is not None:
+            self.stats["hits"] += 1
+            return ruta
+        if llave in self.pending:
+            self.stats["coalesced"] += 1
+            return self.pending[llave]
+        self.stats["misses"] += 1
+        descarga = self.pending[llave] = Descarga(self.path / llave)
+        descarga.tarea = asyncio.ensure_future(self.fill(llave, blob, descarga))
+        return descarga
+
+
+@lru_cache()
+def get_blob_cache() -> Optional[BlobCache]:
+    """Cache de archivos, se crea una sola vez por proceso, es None si no está definido BLOB_CACHE_PATH"""
+    settings = get_settings()
+    if settings.BLOB_CACHE_PATH == "":
+        return None
+    return BlobCache(settings.BLOB_CACHE_PATH, settings.BLOB_CACHE_MAX_BYTES, settings.BLOB_CHUNK_SIZE)
+
+
+def get_blob_cache_stats() -> dict:
+    """Estadísticas del cache de archivos"""
+    cache = get_blob_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats, "files": len(cache.entries), "bytes": cache.bytes, "max_bytes": cache.max_bytes}
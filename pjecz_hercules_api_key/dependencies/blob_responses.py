@@ -0,0 +1,149 @@
+"""
+Blob Responses
+
+Entregar un archivo del depósito por bloques conforme se descarga, con Content-Length, rangos de bytes
+(206 Partial Content) para que los visores de PDF pidan solo las páginas que muestran, y HEAD sin descargar.
+Si está el cache de archivos, se descargan una sola vez al disco y se entregan desde ahí conforme se escriben.
+En lugar del archivo se puede entregar una URL firmada, así los bytes van del depósito al cliente sin pasar por la API.
+"""
+
+import re
+from typing import Iterator, Literal, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+
+from ..config.settings import get_settings
+from ..schemas.urls_firmadas import OneURLFirmadaOut, URLFirmadaOut
+from .blob_cache import Descarga, get_blob_cache
+from .cloud_storage import download, get_signed_url
+
+RANGO_REGEX = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Formas de entregar un archivo: el contenido, una redirección a la URL firmada o la URL firmada en JSON
+Entrega = Literal["archivo", "redireccion", "url"]
+
+
+def parse_range(rango: Optional[str], tamanio: int) -> Optional[tuple[int, int]]:
+    """
+    Primer y último byte, inclusive, del encabezado Range
+
+    Se entrega None para enviar el archivo completo cuando no hay encabezado, no es válido o pide varios rangos.
+    Si el rango empieza después del final del archivo se rechaza con 416 Range Not Satisfiable.
+    """
+    if rango is None or tamanio == 0:
+        return None
+    coincidencia = RANGO_REGEX.match(rango.strip().replace(" ", ""))
+    if coincidencia is None:
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == "" and fin == "":
+        return None
+    if inicio == "":
+        # Los últimos n bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            raise_range_not_satisfiable(tamanio)
+        return max(tamanio - sufijo, 0), tamanio - 1
+    inicio = int(inicio)
+    if fin != "" and int(fin) < inicio:
+        return None
+    if inicio >= tamanio:
+        raise_range_not_satisfiable(tamanio)
+    fin = tamanio - 1 if fin == "" else min(int(fin), tamanio - 1)
+    return inicio, fin
+
+
+def raise_range_not_satisfiable(tamanio: int):
+    """Rechazar el rango con el tamaño del archivo en Content-Range"""
+    raise HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="El rango pedido está fuera del archivo",
+        headers={"Content-Range": f"bytes */{tamanio}"},
+    )
+
+
+def iter_blob(blob, inicio: int, fin: int, chunk_size: int) -> Iterator[bytes]:
+    """Descargar del depósito los bytes de inicio a fin por bloques, se ejecuta en el threadpool"""
+    for posicion in range(inicio, fin + 1, chunk_size):
+        yield download(blob, posicion, min(posicion + chunk_size, fin + 1) - 1)
+
+
+async def blob_response(
+    request: Request,
+    deposito: str,
+    blob,
+    archivo_nombre: str,
+    media_type: str = "application/pdf",
+) -> Response:
+    """Respuesta con el archivo completo o el rango pedido, If-Range con otro ETag entrega el archivo completo"""
+    tamanio = blob.size or 0
+    etag = f'"{blob.generation}"'
+    encabezados = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"inline; filename={archivo_nombre}",
+        "ETag": etag,
+    }
+    rango = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        rango = None
+    limites = parse_range(rango, tamanio)
+    codigo = status.HTTP_200_OK
+    inicio, fin = 0, tamanio - 1
+    if limites is not None:
+        inicio, fin = limites
+        codigo = status.HTTP_206_PARTIAL_CONTENT
+        encabezados["Content-Range"] = f"bytes {inicio}-{fin}/{tamanio}"
+    encabezados["Content-Length"] = str(fin - inicio + 1)
+
+    # En HEAD solo se entregan los encabezados, no se descarga el archivo
+    if request.method == "HEAD":
+        return Response(status_code=codigo, headers=encabezados, media_type=media_type)
+
+    # Si está el cache de archivos se entrega desde el disco, FileResponse atiende el rango con el mismo ETag
+    cache = get_blob_cache()
+    if cache is not None:
+        try:
+            guardado = await cache.fetch(deposito, blob)
+        except Exception:
+            # Si falla el disco se cuenta el error y se entrega directo del depósito
+            cache.stats["errors"] += 1
+            guardado = None
+        if isinstance(guardado, Descarga):
+            # Se está guardando, se entrega conforme se escribe sin descargarlo otra vez
+            return StreamingResponse(
+                content=cache.follow(guardado, blob, inicio, fin),
+                status_code=codigo,
+                headers=encabezados,
+                media_type=media_type,
+            )
+        if guardado is not None:
+            return FileResponse(
+                guardado,
+                headers={"Content-Disposition": encabezados["Content-Disposition"], "ETag": etag},
+                media_type=media_type,
+            )
+    return StreamingResponse(
+        content=iter_blob(blob, inicio, fin, get_settings().BLOB_CHUNK_SIZE),
+        status_code=codigo,
+        headers=encabezados,
+        media_type=media_type,
+    )
+
+
+async def signed_url_response(
+    blob,
+    archivo_nombre: str,
+    entrega: Entrega,
+    media_type: str = "application/pdf",
+) -> Response | OneURLFirmadaOut:
+    """Redirección 302 a la URL firmada del archivo, o la URL con su vencimiento en JSON"""
+    url, expiracion = await get_signed_url(blob, archivo_nombre, media_type)
+    if entrega == "redireccion":
+        return RedirectResponse(url, status_code=status.HTTP_302_FOUND, headers={"Cache-Control": "no-store"})
+    return OneURLFirmadaOut(
+        success=True,
+        message=f"URL firmada que vence en {get_settings().SIGNED_URL_TTL} segundos",
+        data=URLFirmadaOut(url=url, expiracion=expiracion),
+    )
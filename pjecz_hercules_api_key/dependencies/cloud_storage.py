@@ -0,0 +1,215 @@
+"""
+Cloud Storage
+
+Servicio del depósito de archivos que se crea una sola vez por proceso: un solo cliente con su sesión HTTP
+y sus conexiones, y los buckets de los depósitos configurados sin consultarlos en cada solicitud. Si se define
+STORAGE_LOCAL_PATH los archivos se leen de ese directorio, así se puede probar sin Google Cloud Storage.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import google.auth
+from google.auth.credentials import Signing
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+from starlette.concurrency import run_in_threadpool
+
+from ..config.settings import get_settings
+from .exceptions import MyBucketNotFoundError
+
+# Depósitos y la variable de Settings con el nombre de su bucket
+DEPOSITOS = {
+    "edictos": "GCP_BUCKET_EDICTOS",
+    "glosas": "GCP_BUCKET_GLOSAS",
+    "listas_de_acuerdos": "GCP_BUCKET_LISTAS_DE_ACUERDOS",
+    "sentencias": "GCP_BUCKET_SENTENCIAS",
+}
+
+# Llamadas, errores y segundos por operación
+storage_stats: dict[str, dict] = {}
+
+
+@contextmanager
+def record_timing(operacion: str):
+    """Medir la duración de una llamada al depósito y acumularla en la operación"""
+    registro = storage_stats.setdefault(operacion, {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0})
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registro["errors"] += 1
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        registro["calls"] += 1
+        registro["seconds"] += duracion
+        registro["max_seconds"] = max(registro["max_seconds"], duracion)
+
+
+class LocalBlob:
+    """Archivo de un directorio local con los atributos de Blob que se usan al entregarlo"""
+
+    def __init__(self, name: str, path: Path):
+        estado = path.stat()
+        self.name = name
+        self.path = path
+        self.size = estado.st_size
+        self.generation = estado.st_mtime_ns
+        self.updated = datetime.fromtimestamp(estado.st_mtime, tz=timezone.utc)
+
+    def download_as_bytes(self, start: Optional[int] = None, end: Optional[int] = None, checksum=None) -> bytes:
+        """Leer los bytes de start a end, inclusive, como lo hace Blob"""
+        inicio = start or 0
+        with self.path.open("rb") as archivo:
+            archivo.seek(inicio)
+            if end is None:
+                return archivo.read()
+            return archivo.read(end - inicio + 1)
+
+
+class GCSStorageBackend:
+    """Depósitos en Google Cloud Storage con un solo cliente por proceso"""
+
+    def __init__(self, buckets: dict[str, str], pool_size: int):
+        credenciales, proyecto = google.auth.default(scopes=storage.Client.SCOPE)
+        self.credentials = credenciales
+        self.credentials_lock = threading.Lock()
+        sesion = AuthorizedSession(credenciales)
+        sesion.mount("https://", HTTPAdapter(pool_connections=len(buckets) or 1, pool_maxsize=pool_size))
+        self.client = storage.Client(project=proyecto, credentials=credenciales, _http=sesion)
+        # Con bucket() solo se arma la referencia, no se consulta el bucket
+        self.buckets = {deposito: self.client.bucket(nombre) for deposito, nombre in buckets.items()}
+
+    def get_blob(self, deposito: str, blob_name: str) -> Optional[storage.Blob]:
+        """Metadatos del archivo, es None si no existe"""
+        if deposito not in self.buckets:
+            raise MyBucketNotFoundError(f"No está configurado el depósito {deposito}")
+        return self.buckets[deposito].get_blob(blob_name)
+
+    def download(self, blob: storage.Blob, start: int, end: int) -> bytes:
+        """Descargar los bytes de start a end, inclusive"""
+        return blob.download_as_bytes(start=start, end=end, checksum=None)
+
+    def signed_url(self, blob: storage.Blob, segundos: int, archivo_nombre: str, media_type: str) -> str:
+        """
+        URL firmada V4 de la generación del blob
+
+        En App Engine las credenciales no tienen llave privada y se firma con la API de IAM, la cuenta de servicio
+        predeterminada de App Engine requiere el rol roles/iam.serviceAccountTokenCreator sobre sí misma.
+        """
+        argumentos = {}
+        if not isinstance(self.credentials, Signing):
+            with self.credentials_lock:
+                if not self.credentials.valid:
+                    self.credentials.refresh(Request())
+                argumentos = {
+                    "service_account_email": self.credentials.service_account_email,
+                    "access_token": self.credentials.token,
+                }
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=segundos),
+            method="GET",
+            generation=blob.generation,
+            response_disposition=f"inline; filename={archivo_nombre}",
+            response_type=media_type,
+            **argumentos,
+        )
+
+    def stats(self) -> dict:
+        """Estadísticas del backend"""
+        return {"backend": "gcs", "buckets": {deposito: bucket.name for deposito, bucket in self.buckets.items()}}
+
+
+class LocalStorageBackend:
+    """Depósitos en un directorio local, cada uno en un subdirectorio con su nombre, por ejemplo listas_de_acuerdos/"""
+
+    def __init__(self, path: str, depositos: list[str]):
+        self.path = Path(path).resolve()
+        self.depositos = depositos
+
+    def get_blob(self, deposito: str, blob_name: str) -> Optional[LocalBlob]:
+        """Archivo del depósito, es None si no existe o si su ruta sale del directorio del depósito"""
+        if deposito not in self.depositos:
+            raise MyBucketNotFoundError(f"No está configurado el depósito {deposito}")
+        directorio = self.path / deposito
+        ruta = (directorio / blob_name).resolve()
+        if not ruta.is_relative_to(directorio) or not ruta.is_file():
+            return None
+        return LocalBlob(blob_name, ruta)
+
+    def download(self, blob: LocalBlob, start: int, end: int) -> bytes:
+        """Leer los bytes de start a end, inclusive"""
+        return blob.download_as_bytes(start=start, end=end)
+
+    def signed_url(self, blob: LocalBlob, segundos: int, archivo_nombre: str, media_type: str) -> str:
+        """URI del archivo local, no tiene firma ni vencimiento, solo sirve para desarrollo y pruebas"""
+        return blob.path.as_uri()
+
+    def stats(self) -> dict:
+        """Estadísticas del backend"""
+        return {"backend": "local", "path": str(self.path)}
+
+
+@lru_cache()
+def get_storage_backend():
+    """Backend de los depósitos, se crea una sola vez por proceso"""
+    settings = get_settings()
+    if settings.STORAGE_LOCAL_PATH != "":
+        return LocalStorageBackend(settings.STORAGE_LOCAL_PATH, list(DEPOSITOS))
+    buckets = {deposito: getattr(settings, variable) for deposito, variable in DEPOSITOS.items()}
+    return GCSStorageBackend(
+        {deposito: nombre for deposito, nombre in buckets.items() if nombre != ""}, settings.STORAGE_POOL_SIZE
+    )
+
+
+async def get_blob(deposito: str, blob_name: str):
+    """Metadatos del archivo en el depósito, se consultan en el threadpool para no detener el ciclo de eventos"""
+
+    def consultar():
+        with record_timing("get_blob"):
+            return get_storage_backend().get_blob(deposito, blob_name)
+
+    return await run_in_threadpool(consultar)
+
+
+def download(blob, start: int, end: int) -> bytes:
+    """Descargar los bytes de start a end, inclusive, se llama desde el threadpool"""
+    with record_timing("download"):
+        return get_storage_backend().download(blob, start, end)
+
+
+async def get_signed_url(blob, archivo_nombre: str, media_type: str = "application/pdf") -> tuple[str, datetime]:
+    """URL firmada del archivo y su vencimiento, la firma puede consultar IAM y se hace en el threadpool"""
+    segundos = get_settings().SIGNED_URL_TTL
+    vencimiento = datetime.now(timezone.utc) + timedelta(seconds=segundos)
+
+    def firmar():
+        with record_timing("signed_url"):
+            return get_storage_backend().signed_url(blob, segundos, archivo_nombre, media_type)
+
+    return await run_in_threadpool(firmar), vencimiento
+
+
+def get_storage_stats() -> dict:
+    """Estadísticas de las llamadas al depósito"""
+    operaciones = {
+        operacion: {
+            "calls": registro["calls"],
+            "errors": registro["errors"],
+            "avg_ms": round(registro["seconds"] * 1000 / registro["calls"], 3) if registro["calls"] else 0.0,
+            "max_ms": round(registro["max_seconds"] * 1000, 3),
+        }
+        for operacion, registro in storage_stats.items()
+    }
+    # No se crea el backend solo para las métricas
+    if get_storage_backend.cache_info().currsize == 0:
+        return {"backend": None, "operations": operaciones}
+    return {**get_storage_backend().stats(), "operations": operaciones}
@@ -0,0 +1,218 @@
+"""
+Compression
+
+Middleware ASGI que comprime las respuestas con brotli, zstd o gzip según el encabezado Accept-Encoding.
+Brotli y zstd son opcionales, solo se ofrecen si están instaladas sus librerías.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tipos de contenido que ya vienen comprimidos
+TIPOS_COMPRIMIDOS = ("application/pdf", "application/zip", "application/gzip", "image/", "audio/", "video/")
+
+# Bytes antes y después de comprimir por ruta
+compresion_stats: dict[str, dict] = {}
+
+
+class GzipCompressor:
+    """Compresor gzip"""
+
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprimir un bloque"""
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Terminar"""
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    """Compresor brotli"""
+
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprimir un bloque"""
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        """Terminar"""
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    """Compresor zstd"""
+
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprimir un bloque"""
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Terminar"""
+        return self.compressor.flush()
+
+
+def get_available_encodings() -> dict:
+    """Codificaciones disponibles en orden de preferencia"""
+    codificaciones = {}
+    if brotli is not None:
+        codificaciones["br"] = BrotliCompressor
+    if zstandard is not None:
+        codificaciones["zstd"] = ZstdCompressor
+    codificaciones["gzip"] = GzipCompressor
+    return codificaciones
+
+
+def negotiate_encoding(accept_encoding: str, disponibles: list[str]) -> Optional[str]:
+    """Elegir la codificación con mayor q que acepte el cliente, en empate se respeta el orden de preferencia"""
+    calidades = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        calidades[nombre.strip()] = calidad
+    mejor, mejor_calidad = None, 0.0
+    for nombre in disponibles:
+        calidad = calidades.get(nombre, calidades.get("*", 0.0))
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = nombre, calidad
+    return mejor
+
+
+def record_compression(ruta: str, antes: int, despues: int) -> None:
+    """Acumular los bytes antes y después de comprimir de la ruta"""
+    registro = compresion_stats.setdefault(ruta, {"responses": 0, "bytes_in": 0, "bytes_out": 0})
+    registro["responses"] += 1
+    registro["bytes_in"] += antes
+    registro["bytes_out"] += despues
+
+
+def get_compression_stats() -> dict:
+    """Estadísticas de compresión por ruta"""
+    return {ruta: dict(registro) for ruta, registro in compresion_stats.items()}
+
+
+class CompressionMiddleware:
+    """Comprimir las respuestas que superen el tamaño mínimo y que no vengan ya comprimidas"""
+
+    def __init__(self, app, minimum_size: int = 1024, levels: Optional[dict] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or {}
+        self.encodings = get_available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for llave, valor in scope["headers"]:
+            if llave == b"accept-encoding":
+                accept_encoding = valor.decode("latin-1")
+        codificacion = negotiate_encoding(accept_encoding, list(self.encodings))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self, scope, send, codificacion)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """Envoltura del send de una solicitud que comprime el cuerpo de la respuesta"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope, send, codificacion: str):
+        self.middleware = middleware
+        self.scope = scope
+        self.send_original = send
+        self.codificacion = codificacion
+        self.inicio = None
+        self.compresor = None
+        self.sin_comprimir = False
+        self.bytes_antes = 0
+        self.bytes_despues = 0
+
+    def get_route(self) -> str:
+        """Ruta de la solicitud, con sus parámetros sin sustituir si ya se resolvió"""
+        ruta = self.scope.get("route")
+        return getattr(ruta, "path", self.scope.get("path", ""))
+
+    def make_compressor(self):
+        """Crear el compresor con el nivel configurado"""
+        return self.middleware.encodings[self.codificacion](self.middleware.levels[self.codificacion])
+
+    async def send(self, message):
+        """Recibir los mensajes de la aplicación y enviarlos comprimidos si conviene"""
+        if message["type"] == "http.response.start":
+            self.inicio = message
+            return
+        if message["type"] != "http.response.body" or self.sin_comprimir:
+            await self.send_original(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        mas_cuerpo = message.get("more_body", False)
+
+        # Al recibir el primer bloque se decide si se comprime
+        if self.compresor is None:
+            encabezados = {llave.lower(): valor for llave, valor in self.inicio["headers"]}
+            tipo = encabezados.get(b"content-type", b"").decode("latin-1")
+            if (
+                b"content-encoding" in encabezados
+                or tipo.startswith(TIPOS_COMPRIMIDOS)
+                or (not mas_cuerpo and len(cuerpo) < self.middleware.minimum_size)
+            ):
+                self.sin_comprimir = True
+                await self.send_original(self.inicio)
+                await self.send_original(message)
+                return
+            self.compresor = self.make_compressor()
+            # Se conserva Vary de CORS u otros y se le agrega Accept-Encoding
+            encabezados_nuevos = MutableHeaders(
+                raw=[(llave, valor) for llave, valor in self.inicio["headers"] if llave.lower() != b"content-length"]
+            )
+            encabezados_nuevos["content-encoding"] = self.codificacion
+            encabezados_nuevos.add_vary_header("Accept-Encoding")
+
+            # Si la respuesta viene completa se comprime de una vez y se envía su tamaño
+            if not mas_cuerpo:
+                comprimido = self.compresor.compress(cuerpo) + self.compresor.flush()
+                encabezados_nuevos["content-length"] = str(len(comprimido))
+                await self.send_original({**self.inicio, "headers": encabezados_nuevos.raw})
+                await self.send_original({"type": "http.response.body", "body": comprimido})
+                record_compression(self.get_route(), len(cuerpo), len(comprimido))
+                return
+            await self.send_original({**self.inicio, "headers": encabezados_nuevos.raw})
+
+        # Comprimir por bloques cuando la respuesta llega en partes
+        comprimido = self.compresor.compress(cuerpo)
+        if not mas_cuerpo:
+            comprimido += self.compresor.flush()
+        self.bytes_antes += len(cuerpo)
+        self.bytes_despues += len(comprimido)
+        await self.send_original({"type": "http.response.body", "body": comprimido, "more_body": mas_cuerpo})
+        if not mas_cuerpo:
+            record_compression(self.get_route(), self.bytes_antes, self.bytes_despues)
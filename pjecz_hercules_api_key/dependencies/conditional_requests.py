@@ -0,0 +1,84 @@
+"""
+Conditional Requests
+
+ETag débil a partir de (id, modificado) y respuesta 304 cuando el cliente ya tiene la versión vigente
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+import pytz
+from fastapi import Request, Response, status
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.settings import get_settings
+
+
+def make_etag(registro_id: int, modificado: datetime) -> str:
+    """ETag débil del registro"""
+    return f'W/"{registro_id}-{modificado.strftime("%Y%m%d%H%M%S%f")}"'
+
+
+def make_last_modified(modificado: datetime) -> datetime:
+    """Fecha y hora de la última modificación en UTC, las columnas modificado están en la zona horaria de la API"""
+    if modificado.tzinfo is None:
+        modificado = pytz.timezone(get_settings().TZ).localize(modificado)
+    return modificado.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def make_local_datetime(fecha: datetime) -> datetime:
+    """Fecha y hora sin zona horaria en la zona de la API, como las columnas modificado"""
+    if fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone(pytz.timezone(get_settings().TZ)).replace(tzinfo=None)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """¿El cliente ya tiene esta versión? If-None-Match tiene preferencia sobre If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etiquetas = [etiqueta.strip().removeprefix("W/") for etiqueta in if_none_match.split(",")]
+        return etag.removeprefix("W/") in etiquetas
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            fecha = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        return last_modified <= fecha
+    return False
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    database: AsyncSession,
+    registro_id: int,
+    consulta: Select,
+) -> Optional[Response]:
+    """
+    Consultar solo la columna modificado y, si el cliente tiene la versión vigente, entregar la respuesta 304
+
+    La consulta debe entregar una fila con modificado, o con varias columnas de fechas de las que se toma la mayor,
+    y ninguna fila cuando el registro no existe o no es activo. En ese caso se entrega None y no se agregan encabezados.
+    """
+    fila = (await database.execute(consulta)).first()
+    if fila is None:
+        return None
+    fechas = [fecha for fecha in fila if fecha is not None]
+    if len(fechas) == 0:
+        return None
+    modificado = max(fechas)
+    etag = make_etag(registro_id, modificado)
+    last_modified = make_last_modified(modificado)
+    encabezados = {"ETag": etag, "Last-Modified": format_datetime(last_modified, usegmt=True)}
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=encabezados)
+    response.headers.update(encabezados)
+    return None
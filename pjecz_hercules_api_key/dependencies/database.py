@@ -2,40 +2,171 @@
 Database
 """
 
-from typing import Annotated
+import time
+from functools import lru_cache
+from typing import Optional
 
-from fastapi import Depends
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Delete, Engine, Insert, Update, create_engine, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import Pool, QueuePool
 
-from ..config.settings import Settings, get_settings
+from ..config.settings import get_settings
 
 Base = declarative_base()
 
+# Consulta para medir el retraso de la réplica, si ya aplicó todo lo recibido el retraso es cero
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
 
-def get_engine(settings: Annotated[Settings, Depends(get_settings)]) -> Engine:
-    """Database engine"""
+# Estado de la réplica en este proceso, lo actualiza check_replica_lag
+replica_status = {
+    "healthy": False,
+    "lag": None,
+    "checked": 0.0,
+}
+
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Database engine, se crea una sola vez por proceso y mantiene un pool de conexiones"""
+    settings = get_settings()
 
     # Create engine
     engine = create_engine(
-        f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+        f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}",
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
     )
 
     return engine
 
 
-async def get_db(settings: Annotated[Settings, Depends(get_settings)]) -> Session:
-    """Database session"""
+def create_asyncpg_engine(host: str, port: int) -> AsyncEngine:
+    """Crear un engine asíncrono con asyncpg hacia el servidor dado"""
+    settings = get_settings()
+    return create_async_engine(
+        f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@{host}:{port}/{settings.DB_NAME}",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
 
-    # Create engine
-    engine = get_engine(settings)
 
-    # Create session
-    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """Database engine asíncrono con asyncpg hacia el primario, se crea una sola vez por proceso"""
+    settings = get_settings()
+    return create_asyncpg_engine(settings.DB_HOST, settings.DB_PORT)
+
+
+@lru_cache()
+def get_async_replica_engine() -> Optional[AsyncEngine]:
+    """Database engine asíncrono hacia la réplica de lectura, es None si no está configurada"""
+    settings = get_settings()
+    if settings.DB_REPLICA_HOST == "":
+        return None
+    return create_asyncpg_engine(settings.DB_REPLICA_HOST, settings.DB_REPLICA_PORT)
+
+
+class RoutingSession(Session):
+    """Sesión que envía las lecturas a la réplica y las escrituras al primario"""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Elegir el engine para cada sentencia"""
+        replica = get_async_replica_engine()
+        if replica is None or not replica_status["healthy"]:
+            return get_async_engine().sync_engine
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return get_async_engine().sync_engine
+        return replica.sync_engine
+
+
+@lru_cache()
+def get_session_local() -> sessionmaker:
+    """Fábrica de sesiones ligada al engine del proceso"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache()
+def get_async_session_local() -> async_sessionmaker:
+    """Fábrica de sesiones asíncronas que enruta entre el primario y la réplica"""
+    return async_sessionmaker(autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession)
+
 
+async def check_replica_lag() -> None:
+    """Medir el retraso de la réplica cada cierto tiempo, si se atrasa o falla se usa el primario"""
+    replica = get_async_replica_engine()
+    if replica is None:
+        return
+    settings = get_settings()
+    if time.monotonic() - replica_status["checked"] < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return
+    replica_status["checked"] = time.monotonic()
+    try:
+        async with replica.connect() as connection:
+            lag = (await connection.execute(REPLICA_LAG_SQL)).scalar()
+    except Exception:
+        replica_status["healthy"] = False
+        replica_status["lag"] = None
+        return
+    replica_status["lag"] = float(lag) if lag is not None else None
+    replica_status["healthy"] = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG
+
+
+def pool_stats(pool: Pool) -> dict:
+    """Estadísticas de un pool de conexiones"""
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "status": pool.status(),
+    }
+
+
+def get_pool_stats() -> dict:
+    """Estadísticas del pool de conexiones del engine del proceso"""
+    return pool_stats(get_engine().pool)
+
+
+def get_async_pool_stats() -> dict:
+    """Estadísticas del pool de conexiones del engine asíncrono del proceso"""
+    return pool_stats(get_async_engine().pool)
+
+
+def get_replica_stats() -> Optional[dict]:
+    """Estadísticas de la réplica de lectura, es None si no está configurada"""
+    replica = get_async_replica_engine()
+    if replica is None:
+        return None
+    return {
+        "healthy": replica_status["healthy"],
+        "lag": replica_status["lag"],
+        "pool": pool_stats(replica.pool),
+    }
+
+
+async def get_db() -> Session:
+    """Database session hacia el primario, para las escrituras"""
+    database = get_session_local()()
     try:
-        database = session_local()
         yield database
     finally:
         database.close()
+
+
+async def get_async_db() -> AsyncSession:
+    """Database session asíncrona para lecturas, usa la réplica si está al día"""
+    await check_replica_lag()
+    async with get_async_session_local()() as database:
+        yield database
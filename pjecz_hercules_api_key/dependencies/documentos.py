@@ -0,0 +1,65 @@
+"""
+Documentos
+
+Entrega de los archivos de listas de acuerdos, sentencias y edictos: el nombre del blob se obtiene de la columna url,
+se consultan sus metadatos en el depósito y se entrega el archivo por bloques o su URL firmada
+"""
+
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from fastapi import HTTPException, Request, Response, status
+
+from ..config.settings import get_settings
+from ..schemas.urls_firmadas import OneURLFirmadaOut
+from .blob_responses import Entrega, blob_response, signed_url_response
+from .cloud_storage import DEPOSITOS, get_blob
+
+
+def make_blob_name(url: Optional[str]) -> str:
+    """Nombre del blob a partir de la URL del archivo, es la ruta sin el dominio ni el bucket"""
+    if url is None or url.strip() == "":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No está definida la URL del archivo")
+    url_sin_dominio = urlparse(url).path[1:]
+    return unquote("/".join(url_sin_dominio.split("/")[1:]))
+
+
+async def deliver_document(
+    request: Request,
+    deposito: str,
+    url: Optional[str],
+    archivo_nombre: str,
+    entrega: Entrega = "archivo",
+) -> Response | OneURLFirmadaOut:
+    """Entregar el archivo del depósito, el registro y los permisos ya deben estar validados"""
+    blob_name = make_blob_name(url)
+
+    # Obtener los metadatos del archivo desde el depósito
+    try:
+        blob = await get_blob(deposito, blob_name)
+    except Exception as error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"No se pudo accesar al depósito de archivos: {error}",
+        )
+
+    # Validar que el blob existe
+    if blob is None:
+        bucket = getattr(get_settings(), DEPOSITOS[deposito])
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró el archivo {blob_name} en el depósito {bucket}",
+        )
+
+    # Entregar la URL firmada para que el cliente descargue directo del depósito
+    if entrega != "archivo":
+        try:
+            return await signed_url_response(blob, archivo_nombre, entrega)
+        except Exception as error:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"No se pudo firmar la URL del archivo: {error}",
+            )
+
+    # Entregar el archivo por bloques conforme se descarga, o solo el rango pedido
+    return await blob_response(request, deposito, blob, archivo_nombre)
@@ -0,0 +1,77 @@
+"""
+Exports
+
+Descargas de todos los registros de un rango de fechas en NDJSON o CSV. Se consulta con un cursor
+del servidor y se entrega fila por fila, así la memoria no crece con la cantidad de registros.
+"""
+
+import csv
+from datetime import date, datetime
+from io import StringIO
+from typing import AsyncIterator, Literal, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import Select
+
+from ..config.settings import get_settings
+from .database import get_async_session_local
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def check_export_dates(fecha: date | None, fecha_desde: date | None, fecha_hasta: date | None) -> None:
+    """Validar que se pida una fecha o un rango de fechas que no supere EXPORT_MAX_DAYS"""
+    if fecha is not None:
+        return
+    if fecha_desde is None or fecha_hasta is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Se requiere fecha o fecha_desde y fecha_hasta")
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fecha_desde es posterior a fecha_hasta")
+    if (fecha_hasta - fecha_desde).days + 1 > get_settings().EXPORT_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango de fechas supera {get_settings().EXPORT_MAX_DAYS} días",
+        )
+
+
+def csv_value(valor):
+    """Valor para una celda del CSV, las fechas en ISO 8601 igual que en JSON"""
+    if valor is None:
+        return ""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+async def stream_rows(consulta: Select, campos: Sequence[str], formato: str) -> AsyncIterator[bytes]:
+    """Entregar las filas en bloques de EXPORT_YIELD_PER, la sesión es propia porque dura lo que dura la descarga"""
+    yield_per = get_settings().EXPORT_YIELD_PER
+    async with get_async_session_local()() as database:
+        resultado = await database.stream(consulta.execution_options(yield_per=yield_per))
+        if formato == "csv":
+            salida = StringIO()
+            escritor = csv.writer(salida)
+            escritor.writerow(campos)
+            yield salida.getvalue().encode("utf-8")
+            async for filas in resultado.partitions():
+                salida.seek(0)
+                salida.truncate()
+                escritor.writerows([csv_value(valor) for valor in fila] for fila in filas)
+                yield salida.getvalue().encode("utf-8")
+        else:
+            async for filas in resultado.partitions():
+                yield b"".join(to_json(fila._asdict()) + b"\n" for fila in filas)
+
+
+def stream_export(consulta: Select, campos: Sequence[str], formato: Literal["ndjson", "csv"], nombre: str) -> StreamingResponse:
+    """Respuesta que descarga las filas de la consulta de columnas"""
+    return StreamingResponse(
+        stream_rows(consulta, campos, formato),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
@@ -2,15 +2,35 @@
 FastAPI Pagination Custom Page
 """
 
+import binascii
+import json
+import time
 from abc import ABC
-from typing import Any, Generic, Optional, Sequence, TypeVar
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Generic, Literal, Optional, Sequence, TypeVar
 
-from fastapi import Query
-from fastapi_pagination.bases import AbstractPage, AbstractParams
+from fastapi import HTTPException, Query, status
+from fastapi_pagination.api import create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage, AbstractParams, RawParams
+from fastapi_pagination.ext.sqlalchemy import apaginate, create_count_query
 from fastapi_pagination.limit_offset import LimitOffsetParams
 from fastapi_pagination.types import GreaterEqualOne, GreaterEqualZero
+from sqlalchemy import Select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from typing_extensions import Self
 
+from ..config.settings import get_settings
+from .conditional_requests import make_local_datetime
+
+# Totales contados guardados por consulta normalizada, cada valor es (expiración, total)
+conteos_cache: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
 
 class CustomPageParams(LimitOffsetParams):
     """
@@ -19,6 +39,21 @@ class CustomPageParams(LimitOffsetParams):
 
     offset: int = Query(0, ge=0, description="Page offset")
     limit: int = Query(10, ge=1, le=100, description="Page size limit")
+    cursor: str | None = Query(
+        None, description="Cursor de la página siguiente, envíe vacío para iniciar, no todos los listados lo admiten"
+    )
+    include_total: bool = Query(True, description="Incluir el total de registros")
+    total_mode: Literal["exact", "estimate", "cached"] = Query(
+        "exact", description="Total exacto, estimado por el planeador o contado y guardado por un tiempo"
+    )
+
+    def to_raw_params(self) -> RawParams:
+        """Solo se hace el conteo en la consulta de la página cuando se pide el total exacto"""
+        return RawParams(
+            limit=self.limit,
+            offset=self.offset,
+            include_total=self.include_total and self.total_mode == "exact",
+        )
 
 
 T = TypeVar("T")
@@ -36,6 +71,8 @@ class CustomPage(AbstractPage[T], Generic[T], ABC):
     total: Optional[GreaterEqualZero] | None = None
     limit: Optional[GreaterEqualOne] | None = None
     offset: Optional[GreaterEqualZero] | None = None
+    total_type: Literal["exact", "estimate", "cached"] | None = None
+    next_cursor: str | None = None
 
     __params_type__ = CustomPageParams
 
@@ -51,13 +88,39 @@ class CustomPage(AbstractPage[T], Generic[T], ABC):
         Create Custom Page
         """
         raw_params = params.to_raw_params().as_limit_offset()
+        total_type = kwargs.pop("total_type", "exact")
+        total = kwargs.pop("total_count", total)  # Total estimado o guardado que no viene del conteo de la paginación
 
-        if total is None or total == 0:
+        # Por cursor no hay total ni offset, se entrega el cursor de la página siguiente aunque no haya registros
+        if "next_cursor" in kwargs:
+            if len(items) == 0:
+                return cls(
+                    success=False,
+                    message="No se encontraron registros",
+                    data=[],
+                    limit=raw_params.limit,
+                    **kwargs,
+                )
+            return cls(
+                success=True,
+                message="Success",
+                data=items,
+                limit=raw_params.limit,
+                **kwargs,
+            )
+
+        # Con el total exacto se sabe si hay registros, con el estimado o sin total se revisan los items
+        if total_type == "exact":
+            sin_registros = total is None or total == 0
+        else:
+            sin_registros = len(items) == 0
+        if sin_registros:
             return cls(
                 success=False,
                 message="No se encontraron registros",
                 data=[],
-                total=0,
+                total=0 if total_type == "exact" else total,
+                total_type=total_type,
                 limit=raw_params.limit,
                 offset=raw_params.offset,
             )
@@ -67,7 +130,172 @@ class CustomPage(AbstractPage[T], Generic[T], ABC):
             message="Success",
             data=items,
             total=total,
+            total_type=total_type,
             limit=raw_params.limit,
             offset=raw_params.offset,
             **kwargs,
         )
+
+
+class Explain(Executable, ClauseElement):
+    """Sentencia EXPLAIN para obtener la estimación del planeador de PostgreSQL"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    """Compilar EXPLAIN en formato JSON"""
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+async def count_estimate(database: AsyncSession, consulta: Select) -> Optional[int]:
+    """Filas estimadas por el planeador para la consulta, es None si no se pudo estimar"""
+    # En un SAVEPOINT, si falla el EXPLAIN solo se revierte este y la transacción sigue sirviendo para contar
+    try:
+        async with database.begin_nested():
+            plan = (await database.execute(Explain(consulta.order_by(None)))).scalar()
+    except SQLAlchemyError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_cached(database: AsyncSession, consulta: Select) -> int:
+    """Contar las filas de la consulta y guardar el total por un tiempo, la llave es la consulta con sus filtros"""
+    settings = get_settings()
+    count_query = create_count_query(consulta)
+    compilado = count_query.compile()
+    llave = f"{compilado}|{sorted(compilado.params.items(), key=lambda item: item[0])}"
+    ahora = time.monotonic()
+    if llave in conteos_cache and conteos_cache[llave][0] > ahora:
+        conteos_cache.move_to_end(llave)
+        return conteos_cache[llave][1]
+    total = (await database.execute(count_query)).scalar()
+    conteos_cache[llave] = (ahora + settings.PAGINATION_COUNT_CACHE_TTL, total)
+    conteos_cache.move_to_end(llave)
+    while len(conteos_cache) > settings.PAGINATION_COUNT_CACHE_SIZE:
+        conteos_cache.popitem(last=False)
+    return total
+
+
+async def apaginate_custom(database: AsyncSession, consulta: Select, unwrap_mode: str = "auto") -> Any:
+    """Paginar por offset con el total que pidió el cliente: exacto, estimado, guardado o ninguno"""
+    params = resolve_params()
+    if getattr(params, "cursor", None) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Este listado no se puede paginar por cursor, use offset",
+        )
+    if not getattr(params, "include_total", True):
+        return await apaginate(database, consulta, unwrap_mode=unwrap_mode, additional_data={"total_type": None})
+    total_mode = getattr(params, "total_mode", "exact")
+    if total_mode == "estimate":
+        total = await count_estimate(database, consulta)
+        if total is not None:
+            return await apaginate(
+                database, consulta, unwrap_mode=unwrap_mode, additional_data={"total_count": total, "total_type": "estimate"}
+            )
+        total_mode = "cached"  # Si no se pudo estimar, se cuenta y se guarda
+    if total_mode == "cached":
+        total = await count_cached(database, consulta)
+        return await apaginate(
+            database, consulta, unwrap_mode=unwrap_mode, additional_data={"total_count": total, "total_type": "cached"}
+        )
+    return await apaginate(database, consulta, unwrap_mode=unwrap_mode)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codificar los valores de la última fila en un cursor opaco"""
+    valores = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[InstrumentedAttribute]) -> list:
+    """Decodificar el cursor con los tipos de las columnas del orden"""
+    try:
+        valores = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(keys):
+            raise ValueError
+        decodificados = []
+        for key, valor in zip(keys, valores):
+            python_type = key.type.python_type
+            if python_type in (date, datetime):
+                decodificados.append(python_type.fromisoformat(valor))
+            else:
+                decodificados.append(python_type(valor))
+        return decodificados
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válido el cursor") from error
+
+
+def filter_after_cursor(
+    consulta: Select, keys: Sequence[InstrumentedAttribute], cursor: str, ascending: bool = False
+) -> Select:
+    """Filtrar las filas que siguen a las del cursor en el orden de las columnas keys"""
+    valores = decode_cursor(cursor, keys)
+    if len(keys) == 1:
+        return consulta.filter(keys[0] > valores[0] if ascending else keys[0] < valores[0])
+    if ascending:
+        return consulta.filter(tuple_(*keys) > tuple_(*valores))
+    return consulta.filter(tuple_(*keys) < tuple_(*valores))
+
+
+async def apaginate_keyset(
+    database: AsyncSession,
+    consulta: Select,
+    keys: Sequence[InstrumentedAttribute],
+    unwrap_mode: str = "auto",
+) -> Any:
+    """
+    Paginar en orden descendente por las columnas keys, por offset o por cursor si se recibe el parámetro cursor
+
+    Por cursor se filtra a partir de los valores de la última fila, así no se recorren las filas de los offsets
+    y tampoco se hace el conteo total. Con unwrap_mode "no-unwrap" se entregan las filas de una consulta de columnas.
+    """
+    consulta = consulta.order_by(*[key.desc() for key in keys])
+    params = resolve_params()
+    if getattr(params, "cursor", None) is None:
+        return await apaginate_custom(database, consulta, unwrap_mode)
+
+    # Filtrar a partir del cursor, si viene vacío es la primera página
+    if params.cursor != "":
+        consulta = filter_after_cursor(consulta, keys, params.cursor)
+
+    # Consultar una fila de más para saber si hay página siguiente
+    resultado = await database.execute(consulta.limit(params.limit + 1))
+    if unwrap_mode != "no-unwrap":
+        resultado = resultado.scalars()
+    items = list(resultado.unique().all())
+    next_cursor = None
+    if len(items) > params.limit:
+        items = items[: params.limit]
+        next_cursor = encode_cursor([getattr(items[-1], key.key) for key in keys])
+
+    return create_page(items, params=params, next_cursor=next_cursor)
+
+
+async def apaginate_changes(database: AsyncSession, consulta: Select, keys: Sequence[InstrumentedAttribute]) -> Any:
+    """
+    Paginar en orden ascendente por las columnas keys, siempre por cursor, para las consultas de cambios
+
+    El next_cursor es el de la última fila aunque ya no haya más, así el cliente puede continuar después desde ahí.
+    Si la página trae menos filas que el limit, el cliente ya está al día.
+
+    La primera columna de keys es la fecha de modificación, que es el now() del inicio de la transacción. Una
+    transacción que se confirma tarde deja filas con una fecha que el cliente ya pudo haber pasado, por eso solo
+    se entregan las filas modificadas antes de los últimos CAMBIOS_SETTLE_SECONDS segundos.
+    """
+    asentado = make_local_datetime(datetime.now(timezone.utc)) - timedelta(seconds=get_settings().CAMBIOS_SETTLE_SECONDS)
+    consulta = consulta.filter(keys[0] < asentado).order_by(*[key.asc() for key in keys])
+    params = resolve_params()
+    cursor = getattr(params, "cursor", None)
+    if cursor:
+        consulta = filter_after_cursor(consulta, keys, cursor, ascending=True)
+    items = list((await database.execute(consulta.limit(params.limit))).scalars().unique().all())
+    next_cursor = encode_cursor([getattr(items[-1], key.key) for key in keys]) if len(items) > 0 else cursor
+    return create_page(items, params=params, next_cursor=next_cursor)
@@ -0,0 +1,53 @@
+"""
+JSON Responses
+
+Ruta que serializa directo con model_dump_json los esquemas que ya construyó el endpoint, sin validarlos
+de nuevo contra el response_model ni pasarlos por jsonable_encoder
+"""
+
+import functools
+import inspect
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from ..config.settings import get_settings
+
+
+class ModelJSONRoute(APIRoute):
+    """Ruta que entrega el JSON del esquema que regresa el endpoint si es del tipo del response_model"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if get_settings().FAST_JSON_RESPONSES and inspect.iscoroutinefunction(endpoint):
+            endpoint = self.wrap_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+    def wrap_endpoint(self, endpoint: Callable[..., Any], status_code: int | None) -> Callable[..., Any]:
+        """Envolver el endpoint, se agrega un parámetro Response para conservar sus encabezados"""
+        firma = inspect.signature(endpoint)
+        nombre = next((nombre for nombre, parametro in firma.parameters.items() if parametro.annotation is Response), None)
+        recibe_response = nombre is not None
+        if not recibe_response:
+            nombre = "model_json_response"
+
+        @functools.wraps(endpoint)
+        async def envoltura(*args, **kwargs):
+            parcial: Response = kwargs[nombre] if recibe_response else kwargs.pop(nombre)
+            resultado = await endpoint(*args, **kwargs)
+            modelo = self.response_model
+            if not (isinstance(modelo, type) and issubclass(modelo, BaseModel) and isinstance(resultado, modelo)):
+                return resultado
+            respuesta = Response(
+                content=resultado.model_dump_json(by_alias=True),
+                status_code=parcial.status_code or status_code or 200,
+                media_type="application/json",
+            )
+            respuesta.raw_headers.extend((llave, valor) for llave, valor in parcial.headers.raw if llave != b"content-length")
+            return respuesta
+
+        if not recibe_response:
+            parametro = inspect.Parameter(nombre, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+            envoltura.__signature__ = firma.replace(parameters=[*firma.parameters.values(), parametro])
+        return envoltura
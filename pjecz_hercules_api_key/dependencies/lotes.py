@@ -0,0 +1,28 @@
+"""
+Lotes
+
+Consultar varios registros por sus IDs en una sola sentencia WHERE id IN (...)
+"""
+
+from typing import Any, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.settings import get_settings
+
+
+def unique_ids(ids: Sequence[int]) -> list[int]:
+    """IDs sin repetir en el orden en que se recibieron, causa ValueError si no hay o si son más de LOTE_MAX_IDS"""
+    unicos = list(dict.fromkeys(ids))
+    if len(unicos) == 0:
+        raise ValueError("Se requiere al menos un ID")
+    if len(unicos) > get_settings().LOTE_MAX_IDS:
+        raise ValueError(f"Se permiten hasta {get_settings().LOTE_MAX_IDS} IDs por lote")
+    return unicos
+
+
+async def get_by_ids(database: AsyncSession, modelo, ids: Sequence[int], opciones: list) -> dict[int, Any]:
+    """Registros por su ID, incluye los inactivos para que se informe que están eliminados"""
+    consulta = select(modelo).options(*opciones).filter(modelo.id.in_(ids))
+    return {registro.id: registro for registro in (await database.execute(consulta)).scalars().unique().all()}
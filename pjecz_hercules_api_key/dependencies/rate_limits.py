@@ -0,0 +1,200 @@
+"""
+Rate Limits
+
+Cubetas de fichas por api_key: cada api_key tiene un nivel con las solicitudes por segundo, la ráfaga
+y las solicitudes simultáneas permitidas. El estado se guarda en la memoria del proceso o, si se configura
+RATE_LIMIT_REDIS_URL, en un servidor compatible con Redis que comparten todos los procesos.
+"""
+
+import math
+import time
+from functools import lru_cache
+from typing import Optional
+
+from ..config.settings import get_settings
+from .exceptions import MyMissingConfigurationError
+
+# Llave del scope con las cubetas a liberar al terminar de enviar la respuesta
+CONCURRENCIA_POR_LIBERAR = "pjecz_concurrencia_por_liberar"
+
+# Cantidad de solicitudes permitidas y rechazadas por motivo
+rate_limits_stats = {"allowed": 0, "rejected_rate": 0, "rejected_concurrency": 0}
+
+# Tomar una ficha de la cubeta en Redis de forma atómica, entrega 0 si se permite o los segundos a esperar
+TOKEN_BUCKET_LUA = """
+local tokens_key, stamp_key = KEYS[1], KEYS[2]
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(redis.call("GET", tokens_key) or burst)
+local stamp = tonumber(redis.call("GET", stamp_key) or now)
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+local ttl = math.ceil(burst / rate) + 1
+redis.call("SET", tokens_key, tostring(tokens), "EX", ttl)
+redis.call("SET", stamp_key, tostring(now), "EX", ttl)
+return tostring(wait)
+"""
+
+
+class MemoryRateLimitBackend:
+    """Cubetas de fichas en la memoria del proceso"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.concurrent: dict[str, int] = {}
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Tomar una ficha, entrega 0 si se permite o los segundos a esperar"""
+        ahora = time.monotonic()
+        tokens, stamp = self.buckets.pop(key, (float(burst), ahora))
+        tokens = min(float(burst), tokens + (ahora - stamp) * rate)
+        espera = 0.0
+        if tokens < 1:
+            espera = (1 - tokens) / rate
+        else:
+            tokens -= 1
+        self.buckets[key] = (tokens, ahora)
+        while len(self.buckets) > self.max_keys:
+            del self.buckets[next(iter(self.buckets))]
+        return espera
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        """Ocupar un lugar de las solicitudes simultáneas, entrega False si ya no hay"""
+        if self.concurrent.get(key, 0) >= limit:
+            return False
+        self.concurrent[key] = self.concurrent.get(key, 0) + 1
+        return True
+
+    async def release(self, key: str) -> None:
+        """Liberar un lugar de las solicitudes simultáneas"""
+        restantes = self.concurrent.get(key, 0) - 1
+        if restantes > 0:
+            self.concurrent[key] = restantes
+        else:
+            self.concurrent.pop(key, None)
+
+    def stats(self) -> dict:
+        """Estadísticas del estado en memoria"""
+        return {"backend": "memory", "keys": len(self.buckets), "in_flight": sum(self.concurrent.values())}
+
+
+class RedisRateLimitBackend:
+    """Cubetas de fichas en un servidor compatible con Redis, compartidas por todos los procesos"""
+
+    def __init__(self, url: str, prefix: str):
+        try:
+            from redis import asyncio as redis_asyncio  # pylint: disable=import-outside-toplevel
+            from redis.exceptions import RedisError  # pylint: disable=import-outside-toplevel
+        except ImportError as error:
+            raise MyMissingConfigurationError("Falta instalar redis para usar RATE_LIMIT_REDIS_URL") from error
+        self.errors = RedisError
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+        self.script = self.client.register_script(TOKEN_BUCKET_LUA)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Tomar una ficha, entrega 0 si se permite o los segundos a esperar"""
+        llaves = [f"{self.prefix}:{key}:tokens", f"{self.prefix}:{key}:stamp"]
+        try:
+            return float(await self.script(keys=llaves, args=[rate, burst, time.time()]))
+        except self.errors:
+            return 0.0  # Si falla el servidor, se permite la solicitud
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        """Ocupar un lugar de las solicitudes simultáneas, entrega False si ya no hay"""
+        llave = f"{self.prefix}:{key}:concurrent"
+        try:
+            ocupados = await self.client.incr(llave)
+            await self.client.expire(llave, 300)  # Por si un proceso termina sin liberar
+            if ocupados > limit:
+                await self.client.decr(llave)
+                return False
+        except self.errors:
+            pass  # Si falla el servidor, se permite la solicitud
+        return True
+
+    async def release(self, key: str) -> None:
+        """Liberar un lugar de las solicitudes simultáneas"""
+        try:
+            await self.client.decr(f"{self.prefix}:{key}:concurrent")
+        except self.errors:
+            pass
+
+    def stats(self) -> dict:
+        """Estadísticas, el estado está en el servidor"""
+        return {"backend": "redis"}
+
+
+@lru_cache()
+def get_rate_limit_backend():
+    """Backend de las cubetas, se crea una sola vez por proceso"""
+    settings = get_settings()
+    if settings.RATE_LIMIT_REDIS_URL != "":
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL, settings.RATE_LIMIT_REDIS_PREFIX)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+def get_tier(email: str) -> Optional[dict]:
+    """Nivel del usuario, es None si no se limita"""
+    settings = get_settings()
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    nombre = settings.RATE_LIMIT_USERS.get(email, "default")
+    return settings.RATE_LIMIT_TIERS.get(nombre, settings.RATE_LIMIT_TIERS.get("default"))
+
+
+async def check_rate_limit(key: str, tier: dict) -> Optional[int]:
+    """Tomar una ficha de la cubeta del api_key, entrega None si se permite o los segundos para el Retry-After"""
+    espera = await get_rate_limit_backend().take(key, float(tier["rate"]), int(tier["burst"]))
+    if espera > 0:
+        rate_limits_stats["rejected_rate"] += 1
+        return max(1, math.ceil(espera))
+    return None
+
+
+async def acquire_concurrency(key: str, tier: dict) -> bool:
+    """Ocupar un lugar de las solicitudes simultáneas del api_key"""
+    if await get_rate_limit_backend().acquire(key, int(tier["concurrency"])):
+        rate_limits_stats["allowed"] += 1
+        return True
+    rate_limits_stats["rejected_concurrency"] += 1
+    return False
+
+
+async def release_concurrency(key: str) -> None:
+    """Liberar el lugar al terminar la solicitud"""
+    await get_rate_limit_backend().release(key)
+
+
+def get_rate_limit_stats() -> dict:
+    """Estadísticas de los límites de solicitudes"""
+    return {**rate_limits_stats, **get_rate_limit_backend().stats()}
+
+
+class ConcurrencyReleaseMiddleware:
+    """
+    Liberar los lugares de solicitudes simultáneas cuando se termina de enviar la respuesta
+
+    El cierre de las dependencias con yield ocurre antes de enviar el cuerpo de una StreamingResponse, así las descargas
+    y los archivos no ocuparían su lugar mientras se envían. La dependencia agrega la llave a la lista del scope
+    y aquí se libera después de que la aplicación terminó de responder.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        llaves = scope[CONCURRENCIA_POR_LIBERAR] = []
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for llave in llaves:
+                await release_concurrency(llave)
@@ -0,0 +1,117 @@
+"""
+Response Cache
+
+Respuestas guardadas por proceso para los catálogos, la llave es la ruta con sus parámetros y el nivel de permiso
+del usuario. Una respuesta deja de servir al vencer su tiempo o cuando cambia max(modificado) de sus tablas.
+"""
+
+import functools
+import inspect
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.settings import get_settings
+
+# Respuestas guardadas, cada valor es (expiración, versiones de las tablas, contenido JSON)
+respuestas_cache: OrderedDict[str, tuple[float, tuple, bytes]] = OrderedDict()
+respuestas_cache_stats = {"hits": 0, "misses": 0}
+
+# Último max(modificado) de cada tabla, cada valor es (momento de la consulta, max(modificado))
+versiones_tablas: dict[str, tuple[float, Optional[datetime]]] = {}
+
+
+async def get_table_versions(database: AsyncSession, modelos: tuple) -> tuple:
+    """Entregar max(modificado) de cada tabla, se consultan en una sola sentencia las que ya deben revisarse"""
+    intervalo = get_settings().CATALOG_CACHE_PROBE_INTERVAL
+    ahora = time.monotonic()
+    pendientes = [
+        modelo
+        for modelo in modelos
+        if modelo.__tablename__ not in versiones_tablas or versiones_tablas[modelo.__tablename__][0] + intervalo <= ahora
+    ]
+    if pendientes:
+        consulta = select(*[select(func.max(modelo.modificado)).scalar_subquery() for modelo in pendientes])
+        fila = (await database.execute(consulta)).one()
+        for modelo, modificado in zip(pendientes, fila):
+            versiones_tablas[modelo.__tablename__] = (ahora, modificado)
+    return tuple(versiones_tablas[modelo.__tablename__][1] for modelo in modelos)
+
+
+def make_cache_key(request: Request, alcance: Any) -> str:
+    """Llave de la respuesta con la ruta, los parámetros ordenados y el alcance del usuario"""
+    parametros = "&".join(f"{llave}={valor}" for llave, valor in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{parametros}|{alcance}"
+
+
+def cached_response(modulo: str, *modelos) -> Callable:
+    """
+    Decorador para guardar las respuestas de un catálogo
+
+    El endpoint debe recibir current_user y database. El nivel de permiso del usuario en el módulo forma parte
+    de la llave, así nunca se entrega una respuesta guardada a quien no la podría obtener.
+    """
+
+    def decorador(funcion: Callable) -> Callable:
+        firma = inspect.signature(funcion)
+        recibe_request = "request" in firma.parameters
+
+        @functools.wraps(funcion)
+        async def envoltura(*args, **kwargs):
+            request: Request = kwargs["request"] if recibe_request else kwargs.pop("request")
+            database: AsyncSession = kwargs["database"]
+            settings = get_settings()
+            if settings.CATALOG_CACHE_TTL <= 0:
+                return await funcion(*args, **kwargs)
+
+            # Si hay una respuesta vigente con las mismas versiones de las tablas, entregarla
+            llave = make_cache_key(request, kwargs["current_user"].permissions.get(modulo, 0))
+            versiones = await get_table_versions(database, modelos)
+            if llave in respuestas_cache:
+                expiracion, versiones_guardadas, contenido = respuestas_cache[llave]
+                if expiracion > time.monotonic() and versiones_guardadas == versiones:
+                    respuestas_cache.move_to_end(llave)
+                    respuestas_cache_stats["hits"] += 1
+                    return Response(content=contenido, media_type="application/json")
+                del respuestas_cache[llave]
+            respuestas_cache_stats["misses"] += 1
+
+            # Ejecutar el endpoint, solo se guardan las respuestas que son esquemas
+            resultado = await funcion(*args, **kwargs)
+            if not isinstance(resultado, BaseModel):
+                return resultado
+            contenido = resultado.model_dump_json(by_alias=True).encode("utf-8")
+            respuestas_cache[llave] = (time.monotonic() + settings.CATALOG_CACHE_TTL, versiones, contenido)
+            respuestas_cache.move_to_end(llave)
+            while len(respuestas_cache) > settings.CATALOG_CACHE_SIZE:
+                respuestas_cache.popitem(last=False)
+            return Response(content=contenido, media_type="application/json")
+
+        # Agregar el request a la firma para que FastAPI lo entregue
+        if not recibe_request:
+            parametro = inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            envoltura.__signature__ = firma.replace(parameters=[*firma.parameters.values(), parametro])
+        return envoltura
+
+    return decorador
+
+
+def invalidate_cached_responses() -> None:
+    """Descartar todas las respuestas guardadas y las versiones de las tablas"""
+    respuestas_cache.clear()
+    versiones_tablas.clear()
+
+
+def get_response_cache_stats() -> dict:
+    """Estadísticas de las respuestas guardadas"""
+    return {
+        "size": len(respuestas_cache),
+        "hits": respuestas_cache_stats["hits"],
+        "misses": respuestas_cache_stats["misses"],
+    }
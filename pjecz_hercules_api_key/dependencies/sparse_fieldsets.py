@@ -0,0 +1,98 @@
+"""
+Sparse Fieldsets
+
+Parámetro fields= de los paginados: se consultan solo las columnas de los campos pedidos y se hacen
+solo los JOIN que necesitan, el esquema de la respuesta se reduce a esos mismos campos.
+"""
+
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from fastapi_pagination.api import set_page
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, aliased
+
+from .fastapi_pagination_custom_page import CustomPage, apaginate_keyset
+
+
+def join_relation(consulta: Select, uniones: Optional[dict[str, Any]], relacion: InstrumentedAttribute) -> tuple[Select, Any]:
+    """Consulta y clase para filtrar por la relación, se usa el alias del JOIN que ya hizo select() o se agrega el JOIN"""
+    if uniones is not None and relacion.key in uniones:
+        return consulta, uniones[relacion.key]
+    return consulta.join(relacion), relacion.property.mapper.class_
+
+
+@lru_cache(maxsize=128)
+def make_fields_schema(esquema: type[BaseModel], campos: tuple[str, ...]) -> type[BaseModel]:
+    """Esquema con solo los campos pedidos, conserva el tipo y el valor por defecto de cada uno"""
+    definiciones = {campo: (esquema.model_fields[campo].annotation, esquema.model_fields[campo]) for campo in campos}
+    return create_model(f"{esquema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **definiciones)
+
+
+class SparseFieldset:
+    """
+    Campos de un esquema que se pueden pedir con fields=
+
+    Los campos que son columnas del modelo se toman directo. Los que vienen de las relaciones se declaran
+    en rutas con la forma "relacion.relacion.columna", por ejemplo "autoridad.distrito.clave".
+    """
+
+    def __init__(self, modelo, esquema: type[BaseModel], rutas: dict[str, str]):
+        self.modelo = modelo
+        self.esquema = esquema
+        self.rutas = rutas
+
+    def parse(self, fields: str) -> Optional[list[str]]:
+        """Validar los campos pedidos, es None si no se pidió ninguno, id siempre se incluye"""
+        pedidos = {campo.strip() for campo in fields.split(",") if campo.strip() != ""}
+        if len(pedidos) == 0:
+            return None
+        desconocidos = pedidos - set(self.esquema.model_fields)
+        if desconocidos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No son válidos los campos: {', '.join(sorted(desconocidos))}",
+            )
+        pedidos.add("id")
+        return [campo for campo in self.esquema.model_fields if campo in pedidos]
+
+    def select(self, campos: Sequence[str]) -> tuple[Select, dict[str, Any]]:
+        """
+        Consulta con las columnas de los campos y los JOIN de sus relaciones, cada relación se une una sola vez
+
+        También se entregan los alias de los JOIN por su ruta, por ejemplo "autoridad", para que los filtros los usen.
+        """
+        columnas = []
+        uniones = []
+        alias = {(): self.modelo}
+        for campo in campos:
+            if campo not in self.rutas:
+                columnas.append(getattr(self.modelo, campo).label(campo))
+                continue
+            *relaciones, columna = self.rutas[campo].split(".")
+            for posicion in range(1, len(relaciones) + 1):
+                ruta = tuple(relaciones[:posicion])
+                if ruta not in alias:
+                    relacion: InstrumentedAttribute = getattr(alias[ruta[:-1]], ruta[-1])
+                    alias[ruta] = aliased(relacion.property.mapper.class_)
+                    uniones.append(relacion.of_type(alias[ruta]))
+            columnas.append(getattr(alias[tuple(relaciones)], columna).label(campo))
+        consulta = select(*columnas)
+        for union in uniones:
+            consulta = consulta.join(union)
+        return consulta, {".".join(ruta): clase for ruta, clase in alias.items() if ruta != ()}
+
+    async def apaginate(
+        self,
+        database: AsyncSession,
+        consulta: Select,
+        campos: Sequence[str],
+        keys: Sequence[InstrumentedAttribute],
+    ) -> Response:
+        """Paginar las filas de la consulta con el esquema reducido a los campos"""
+        with set_page(CustomPage[make_fields_schema(self.esquema, tuple(campos))]):
+            pagina = await apaginate_keyset(database, consulta, keys=keys, unwrap_mode="no-unwrap")
+        return Response(content=pagina.model_dump_json(by_alias=True), media_type="application/json")
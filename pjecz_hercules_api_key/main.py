@@ -4,16 +4,21 @@ PJECZ Hércules API Key
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi_pagination import add_pagination
 
 from .config.settings import get_settings
+from .dependencies.compression import CompressionMiddleware
+from .dependencies.rate_limits import ConcurrencyReleaseMiddleware
 from .routers.autoridades import autoridades
+from .routers.batch import batch
 from .routers.distritos import distritos
 from .routers.edictos import edictos
 from .routers.exh_exhortos import exh_exhortos
 from .routers.listas_de_acuerdos import listas_de_acuerdos
 from .routers.materias import materias
 from .routers.materias_tipos_juicios import materias_tipos_juicios
+from .routers.metricas import metricas
 from .routers.modulos import modulos
 from .routers.municipios import municipios
 from .routers.permisos import permisos
@@ -28,26 +33,45 @@ app = FastAPI(
     description="API de uso público para consultar edictos, listas de acuerdos, sentencias, etc.",
     docs_url="/docs",
     redoc_url=None,
+    default_response_class=ORJSONResponse,
 )
 
+# ConcurrencyReleaseMiddleware, libera las solicitudes simultáneas al terminar de enviar la respuesta
+app.add_middleware(ConcurrencyReleaseMiddleware)
+
 # CORSMiddleware
 settings = get_settings()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ORIGINS.split(","),
     allow_credentials=False,
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "HEAD", "POST"],
     allow_headers=["*"],
+    expose_headers=["Accept-Ranges", "Content-Disposition", "Content-Length", "Content-Range", "ETag"],
 )
 
+# CompressionMiddleware
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels={
+            "br": settings.COMPRESSION_LEVEL_BROTLI,
+            "gzip": settings.COMPRESSION_LEVEL_GZIP,
+            "zstd": settings.COMPRESSION_LEVEL_ZSTD,
+        },
+    )
+
 # Rutas
 app.include_router(autoridades)
+app.include_router(batch)
 app.include_router(distritos)
 app.include_router(edictos)
 app.include_router(exh_exhortos)
 app.include_router(listas_de_acuerdos)
 app.include_router(materias)
 app.include_router(materias_tipos_juicios)
+app.include_router(metricas)
 app.include_router(modulos)
 app.include_router(municipios)
 app.include_router(permisos)
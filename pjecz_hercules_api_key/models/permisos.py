@@ -23,6 +23,7 @@ class Permiso(Base, UniversalMixin):
         3: "VER, MODIFICAR y CREAR",
         4: "ADMINISTRAR",
     }
+    # Las descargas y los cambios no son un nivel, requieren VER en el módulo con EXPORTAR, como "SENTENCIAS EXPORTAR"
 
     # Nombre de la tabla
     __tablename__ = "permisos"
@@ -5,7 +5,7 @@ Sentencias, modelos
 from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import JSON, ForeignKey, String
+from sqlalchemy import JSON, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..dependencies.database import Base
@@ -18,6 +18,9 @@ class Sentencia(Base, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "sentencias"
 
+    # Índice para consultar los cambios en orden de modificación
+    __table_args__ = (Index("ix_sentencias_modificado_id", "modificado", "id"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -39,13 +42,13 @@ class Sentencia(Base, UniversalMixin):
     archivo: Mapped[str] = mapped_column(String(256), default="")
     url: Mapped[str] = mapped_column(String(512), default="")
 
-    # Columnas para Retrieval-Augmented Generation (RAG)
+    # Columnas para Retrieval-Augmented Generation (RAG), los JSON solo se cargan con undefer_group("rag")
     rag_fue_analizado_tiempo: Mapped[Optional[datetime]]
-    rag_analisis: Mapped[Optional[dict]] = mapped_column(JSON)
+    rag_analisis: Mapped[Optional[dict]] = mapped_column(JSON, deferred=True, deferred_group="rag", deferred_raiseload=True)
     rag_fue_sintetizado_tiempo: Mapped[Optional[datetime]]
-    rag_sintesis: Mapped[Optional[dict]] = mapped_column(JSON)
+    rag_sintesis: Mapped[Optional[dict]] = mapped_column(JSON, deferred=True, deferred_group="rag", deferred_raiseload=True)
     rag_fue_categorizado_tiempo: Mapped[Optional[datetime]]
-    rag_categorias: Mapped[Optional[dict]] = mapped_column(JSON)
+    rag_categorias: Mapped[Optional[dict]] = mapped_column(JSON, deferred=True, deferred_group="rag", deferred_raiseload=True)
 
     @property
     def distrito_clave(self):
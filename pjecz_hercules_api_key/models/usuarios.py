@@ -42,28 +42,11 @@ class Usuario(Base, UniversalMixin):
     usuarios_roles: Mapped[List["UsuarioRol"]] = relationship("UsuarioRol", back_populates="usuario")
 
     # Propiedades
-    permisos_consultados = {}
-
     @property
     def nombre(self):
         """Junta nombres, apellido_paterno y apellido materno"""
         return self.nombres + " " + self.apellido_paterno + " " + self.apellido_materno
 
-    @property
-    def permissions(self):
-        """Entrega un diccionario con todos los permisos"""
-        if len(self.permisos_consultados) > 0:
-            return self.permisos_consultados
-        self.permisos_consultados = {}
-        for usuario_rol in self.usuarios_roles:
-            if usuario_rol.estatus == "A":
-                for permiso in usuario_rol.rol.permisos:
-                    if permiso.estatus == "A":
-                        etiqueta = permiso.modulo.nombre
-                        if etiqueta not in self.permisos_consultados or permiso.nivel > self.permisos_consultados[etiqueta]:
-                            self.permisos_consultados[etiqueta] = permiso.nivel
-        return self.permisos_consultados
-
     def can(self, modulo_nombre: str, permission: int):
         """¿Tiene permiso?"""
         if modulo_nombre in self.permisos:
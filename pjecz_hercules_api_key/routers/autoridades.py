@@ -5,26 +5,40 @@ Autoridades
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from sqlalchemy.orm import joinedload
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.response_cache import cached_response
 from ..dependencies.safe_string import safe_clave
 from ..models.autoridades import Autoridad
 from ..models.distritos import Distrito
 from ..models.materias import Materia
+from ..models.municipios import Municipio
 from ..models.permisos import Permiso
 from ..schemas.autoridades import AutoridadOut, OneAutoridadOut
 
-autoridades = APIRouter(prefix="/api/v5/autoridades", tags=["autoridades"])
+autoridades = APIRouter(prefix="/api/v5/autoridades", tags=["autoridades"], route_class=ModelJSONRoute)
+
+
+def autoridad_options() -> list:
+    """Cargar en la misma consulta, con JOIN, las relaciones que necesitan las propiedades del esquema"""
+    return [
+        joinedload(Autoridad.distrito),
+        joinedload(Autoridad.materia),
+        joinedload(Autoridad.municipio),
+    ]
 
 
 @autoridades.get("/{clave}", response_model=OneAutoridadOut)
+@cached_response("AUTORIDADES", Autoridad, Distrito, Materia, Municipio)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     clave: str,
 ):
     """Detalle de una autoridad a partir de su clave"""
@@ -35,7 +49,9 @@ async def detalle(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
     try:
-        autoridad = database.query(Autoridad).filter_by(clave=clave).one()
+        autoridad = (
+            await database.execute(select(Autoridad).options(*autoridad_options()).filter_by(clave=clave))
+        ).scalar_one()
     except (MultipleResultsFound, NoResultFound):
         return OneAutoridadOut(success=False, message="No existe esa autoridad")
     if autoridad.estatus != "A":
@@ -44,9 +60,10 @@ async def detalle(
 
 
 @autoridades.get("", response_model=CustomPage[AutoridadOut])
+@cached_response("AUTORIDADES", Autoridad, Distrito, Materia, Municipio)
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     distrito_clave: str = "",
     es_jurisdiccional: bool | None = None,
     es_notaria: bool | None = None,
@@ -56,7 +73,7 @@ async def paginado(
     """Paginado de autoridades"""
     if current_user.permissions.get("AUTORIDADES", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Autoridad)
+    consulta = select(Autoridad).options(*autoridad_options())
     if distrito_clave:
         try:
             distrito_clave = safe_clave(distrito_clave)
@@ -75,4 +92,4 @@ async def paginado(
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave de la materia")
         consulta = consulta.join(Materia).filter(Materia.clave == materia_clave).filter(Materia.estatus == "A")
-    return paginate(consulta.filter(Autoridad.estatus == "A").order_by(Autoridad.clave))
+    return await apaginate_custom(database, consulta.filter(Autoridad.estatus == "A").order_by(Autoridad.clave))
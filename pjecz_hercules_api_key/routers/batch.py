@@ -0,0 +1,47 @@
+"""
+Batch
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+
+from ..config.settings import Settings, get_settings
+from ..dependencies.authentications import UsuarioInDB, get_current_active_user, hash_api_key
+from ..dependencies.batch_requests import run_batch
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.rate_limits import check_rate_limit, get_tier
+from ..schemas.batch import BatchIn, OneBatchOut
+
+batch = APIRouter(prefix="/api/v5/batch", tags=["batch"], route_class=ModelJSONRoute)
+
+
+@batch.post("", response_model=OneBatchOut)
+async def ejecutar(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    request: Request,
+    batch_in: BatchIn,
+):
+    """Ejecutar varias solicitudes GET en una sola, comparten el usuario autentificado"""
+    if len(batch_in.paths) == 0:
+        return OneBatchOut(success=False, message="Se requiere al menos una ruta")
+    if len(batch_in.paths) > settings.BATCH_MAX_REQUESTS:
+        return OneBatchOut(success=False, message=f"Se permiten hasta {settings.BATCH_MAX_REQUESTS} rutas por lote")
+
+    # Cada solicitud del lote toma una ficha de la cubeta, la primera ya la tomó get_current_active_user
+    tier = get_tier(current_user.email)
+    if tier is not None:
+        for _ in range(len(batch_in.paths) - 1):
+            segundos = await check_rate_limit(hash_api_key(current_user.api_key), tier)
+            if segundos is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Demasiadas solicitudes por segundo",
+                    headers={"Retry-After": str(segundos)},
+                )
+
+    # Ejecutar las solicitudes, las respuestas se incluyen tal cual, sin decodificarlas
+    respuestas = await run_batch(request, current_user, batch_in.paths, settings.BATCH_CONCURRENCY)
+    return ORJSONResponse({"success": True, "message": f"Lote de {len(respuestas)} solicitudes", "data": respuestas})
@@ -5,24 +5,27 @@ Distritos
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 from sqlalchemy.exc import MultipleResultsFound, NoResultFound
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.response_cache import cached_response
 from ..dependencies.safe_string import safe_clave
 from ..models.distritos import Distrito
 from ..models.permisos import Permiso
 from ..schemas.distritos import DistritoOut, OneDistritoOut
 
-distritos = APIRouter(prefix="/api/v5/distritos", tags=["distritos"])
+distritos = APIRouter(prefix="/api/v5/distritos", tags=["distritos"], route_class=ModelJSONRoute)
 
 
 @distritos.get("/{clave}", response_model=OneDistritoOut)
+@cached_response("DISTRITOS", Distrito)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     clave: str,
 ):
     """Detalle de una distrito a partir de su clave"""
@@ -33,7 +36,7 @@ async def detalle(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
     try:
-        distrito = database.query(Distrito).filter_by(clave=clave).one()
+        distrito = (await database.execute(select(Distrito).filter_by(clave=clave))).scalar_one()
     except (MultipleResultsFound, NoResultFound):
         return OneDistritoOut(success=False, message="No existe ese distrito")
     if distrito.estatus != "A":
@@ -42,18 +45,19 @@ async def detalle(
 
 
 @distritos.get("", response_model=CustomPage[DistritoOut])
+@cached_response("DISTRITOS", Distrito)
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     es_distrito: bool | None = None,
     es_jurisdiccional: bool | None = None,
 ):
     """Paginado de distritos"""
     if current_user.permissions.get("DISTRITOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Distrito)
+    consulta = select(Distrito)
     if es_distrito is not None:
         consulta = consulta.filter_by(es_distrito=es_distrito)
     if es_jurisdiccional is not None:
         consulta = consulta.filter_by(es_jurisdiccional=es_jurisdiccional)
-    return paginate(consulta.filter_by(estatus="A").order_by(Distrito.clave))
+    return await apaginate_custom(database, consulta.filter_by(estatus="A").order_by(Distrito.clave))
@@ -2,65 +2,212 @@
 Edictos
 """
 
-from datetime import date
-from typing import Annotated
+from datetime import date, datetime
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import Select, select
+from sqlalchemy.orm import joinedload, undefer_group
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.blob_responses import Entrega
+from ..dependencies.conditional_requests import check_not_modified, make_local_datetime
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.documentos import deliver_document
+from ..dependencies.exports import check_export_dates, stream_export
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_changes, apaginate_keyset
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.lotes import get_by_ids, unique_ids
 from ..dependencies.safe_string import safe_clave
+from ..dependencies.sparse_fieldsets import SparseFieldset, join_relation
 from ..models.autoridades import Autoridad
 from ..models.edictos import Edicto
 from ..models.permisos import Permiso
-from ..schemas.edictos import EdictoOut, EdictoRAGOut, OneEdictoOut
+from ..schemas.edictos import EdictoCambioOut, EdictoOut, EdictoRAGOut, LoteEdictoOut, LoteEdictosOut, OneEdictoOut
+from ..schemas.lotes import LoteIn
 
-edictos = APIRouter(prefix="/api/v5/edictos", tags=["edictos"])
+edictos = APIRouter(prefix="/api/v5/edictos", tags=["edictos"], route_class=ModelJSONRoute)
+
+
+def edicto_options() -> list:
+    """Cargar en la misma consulta, con JOIN, las relaciones que necesitan las propiedades del esquema"""
+    return [joinedload(Edicto.autoridad).joinedload(Autoridad.distrito)]
+
+
+edicto_fieldset = SparseFieldset(
+    Edicto,
+    EdictoOut,
+    {
+        "distrito_clave": "autoridad.distrito.clave",
+        "distrito_nombre": "autoridad.distrito.nombre",
+        "distrito_nombre_corto": "autoridad.distrito.nombre_corto",
+        "autoridad_clave": "autoridad.clave",
+        "autoridad_descripcion": "autoridad.descripcion",
+        "autoridad_descripcion_corta": "autoridad.descripcion_corta",
+    },
+)
+
+
+def edicto_filters(
+    consulta: Select,
+    autoridad_clave: str,
+    fecha: date | None,
+    fecha_desde: date | None,
+    fecha_hasta: date | None,
+    uniones: dict[str, Any] | None = None,
+) -> Select:
+    """Filtros de los paginados y de las descargas, solo se entregan los activos, uniones son los alias de select()"""
+    if autoridad_clave:
+        try:
+            autoridad_clave = safe_clave(autoridad_clave)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
+        consulta, autoridad = join_relation(consulta, uniones, Edicto.autoridad)
+        consulta = consulta.filter(autoridad.clave == autoridad_clave).filter(autoridad.estatus == "A")
+    if fecha is not None:
+        consulta = consulta.filter(Edicto.fecha == fecha)
+    else:
+        if fecha_desde is not None:
+            consulta = consulta.filter(Edicto.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            consulta = consulta.filter(Edicto.fecha <= fecha_hasta)
+    return consulta.filter(Edicto.estatus == "A")
+
+
+@edictos.get("/cambios", response_model=CustomPage[EdictoCambioOut])
+async def cambios(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    modificado_desde: datetime | None = None,
+):
+    """Edictos creados, modificados o eliminados, en orden de modificación, para mantener una copia al día"""
+    if current_user.permissions.get("EDICTOS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    consulta = select(Edicto).options(*edicto_options())
+    if modificado_desde is not None:
+        consulta = consulta.filter(Edicto.modificado >= make_local_datetime(modificado_desde))
+    return await apaginate_changes(database, consulta, keys=[Edicto.modificado, Edicto.id])
+
+
+@edictos.get("/export")
+async def export(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    autoridad_clave: str = "",
+    fecha: date | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    fields: str = "",
+    formato: Literal["ndjson", "csv"] = "ndjson",
+):
+    """Descargar los edictos de una fecha o de un rango de fechas en NDJSON o CSV"""
+    if current_user.permissions.get("EDICTOS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    check_export_dates(fecha, fecha_desde, fecha_hasta)
+    campos = edicto_fieldset.parse(fields) or list(EdictoOut.model_fields)
+    consulta, uniones = edicto_fieldset.select(campos)
+    consulta = edicto_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, uniones)
+    return stream_export(consulta.order_by(Edicto.id), campos, formato, "edictos")
+
+
+@edictos.api_route("/visualizar/{edicto_id}", methods=["GET", "HEAD"])
+async def visualizar(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    edicto_id: int,
+    entrega: Entrega = "archivo",
+):
+    """Visualizar el archivo de un edicto en un iframe a partir de su ID, o entregar su URL firmada"""
+    if current_user.permissions.get("EDICTOS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    edicto = await database.get(Edicto, edicto_id, options=edicto_options())
+    if edicto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No existe ese edicto")
+    if edicto.estatus != "A":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No es activo ese edicto, está eliminado")
+
+    # Definir el nombre del archivo para la respuesta, varios edictos comparten autoridad y fecha
+    autoridad_clave = edicto.autoridad.clave
+    fecha_str = edicto.fecha.strftime("%Y-%m-%d")
+    archivo_nombre = f"edicto_{autoridad_clave}_{fecha_str}_{edicto.id}.pdf"
+
+    # Entregar el archivo o su URL firmada
+    return await deliver_document(request, "edictos", edicto.url, archivo_nombre, entrega)
+
+
+@edictos.post("/lote", response_model=LoteEdictosOut)
+async def lote(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    lote_in: LoteIn,
+):
+    """Detalle de varios edictos a partir de sus IDs, se consultan en una sola sentencia"""
+    if current_user.permissions.get("EDICTOS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    try:
+        ids = unique_ids(lote_in.ids)
+    except ValueError as error:
+        return LoteEdictosOut(success=False, message=str(error))
+    registros = await get_by_ids(database, Edicto, ids, [*edicto_options(), undefer_group("rag")])
+    resultados = []
+    for registro_id in ids:
+        edicto = registros.get(registro_id)
+        if edicto is None:
+            resultados.append(LoteEdictoOut(id=registro_id, success=False, message="No existe ese edicto"))
+        elif edicto.estatus != "A":
+            resultados.append(LoteEdictoOut(id=registro_id, success=False, message="No es activo ese edicto, está eliminado"))
+        else:
+            resultados.append(
+                LoteEdictoOut(
+                    id=registro_id, success=True, message="Detalle de un edicto", data=EdictoRAGOut.model_validate(edicto)
+                )
+            )
+    return LoteEdictosOut(success=True, message="Lote de edictos", data=resultados)
 
 
 @edictos.get("/{edicto_id}", response_model=OneEdictoOut)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    response: Response,
     edicto_id: int,
 ):
     """Detalle de un edicto a partir de su ID"""
     if current_user.permissions.get("EDICTOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    edicto = database.query(Edicto).get(edicto_id)
+    consulta = select(Edicto.modificado).filter(Edicto.id == edicto_id, Edicto.estatus == "A")
+    no_modificado = await check_not_modified(request, response, database, edicto_id, consulta)
+    if no_modificado is not None:
+        return no_modificado
+    edicto = await database.get(Edicto, edicto_id, options=[*edicto_options(), undefer_group("rag")])
     if edicto is None:
         return OneEdictoOut(success=False, message="No existe ese edicto")
     if edicto.estatus != "A":
-        return OneEdictoOut(success=False, message="No es activa ese edicto, está eliminado")
+        return OneEdictoOut(success=False, message="No es activo ese edicto, está eliminado")
     return OneEdictoOut(success=True, message="Detalle de un edicto", data=EdictoRAGOut.model_validate(edicto))
 
 
 @edictos.get("", response_model=CustomPage[EdictoOut])
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     autoridad_clave: str = "",
     fecha: date | None = None,
     fecha_desde: date | None = None,
     fecha_hasta: date | None = None,
+    fields: str = "",
 ):
     """Paginado de edictos"""
     if current_user.permissions.get("EDICTOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Edicto)
-    if autoridad_clave:
-        try:
-            autoridad_clave = safe_clave(autoridad_clave)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-        consulta = consulta.join(Autoridad).filter(Autoridad.clave == autoridad_clave).filter(Autoridad.estatus == "A")
-    if fecha is not None:
-        consulta = consulta.filter(Edicto.fecha == fecha)
+    campos = edicto_fieldset.parse(fields)
+    uniones = None
+    if campos is None:
+        consulta = select(Edicto).options(*edicto_options())
     else:
-        if fecha_desde is not None:
-            consulta = consulta.filter(Edicto.fecha >= fecha_desde)
-        if fecha_hasta is not None:
-            consulta = consulta.filter(Edicto.fecha <= fecha_hasta)
-    return paginate(consulta.filter(Edicto.estatus == "A").order_by(Edicto.id.desc()))
+        consulta, uniones = edicto_fieldset.select(campos)
+    consulta = edicto_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, uniones)
+    if campos is not None:
+        return await edicto_fieldset.apaginate(database, consulta, campos, keys=[Edicto.id])
+    return await apaginate_keyset(database, consulta, keys=[Edicto.id])
@@ -4,13 +4,16 @@ Exh Exhortos
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
 
 from ..config.settings import Settings, get_settings
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.conditional_requests import check_not_modified
+from ..dependencies.database import AsyncSession, Session, get_async_db, get_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_keyset
+from ..dependencies.json_responses import ModelJSONRoute
 from ..dependencies.safe_string import safe_clave, safe_string, safe_url
 from ..models.autoridades import Autoridad
 from ..models.estados import Estado
@@ -26,21 +29,52 @@ from ..schemas.exh_exhortos import ExhExhortoIn, ExhExhortoOut, ExhExhortoPagina
 from ..schemas.exh_exhortos_archivos import ExhExhortoArchivoOut
 from ..schemas.exh_exhortos_partes import ExhExhortoParteOut
 
-exh_exhortos = APIRouter(prefix="/api/v5/exh_exhortos", tags=["exhortos"])
+exh_exhortos = APIRouter(prefix="/api/v5/exh_exhortos", tags=["exhortos"], route_class=ModelJSONRoute)
+
+
+def exh_exhorto_options() -> list:
+    """Cargar en la misma consulta, con JOIN, las relaciones que necesitan las propiedades del esquema"""
+    return [
+        joinedload(ExhExhorto.autoridad).joinedload(Autoridad.municipio),
+        joinedload(ExhExhorto.exh_area),
+        joinedload(ExhExhorto.municipio_origen),
+    ]
 
 
 @exh_exhortos.get("/{exh_exhorto_id}", response_model=OneExhExhortoOut)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    response: Response,
     exh_exhorto_id: int,
 ):
     """Detalle de un exhorto a partir de su ID"""
     if current_user.permissions.get("EXH EXHORTOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
+    # Si el cliente tiene la versión vigente del exhorto, sus partes y sus archivos, entregar 304
+    consulta = select(
+        ExhExhorto.modificado,
+        select(func.max(ExhExhortoParte.modificado)).filter(ExhExhortoParte.exh_exhorto_id == ExhExhorto.id).scalar_subquery(),
+        select(func.max(ExhExhortoArchivo.modificado))
+        .filter(ExhExhortoArchivo.exh_exhorto_id == ExhExhorto.id)
+        .scalar_subquery(),
+    ).filter(ExhExhorto.id == exh_exhorto_id, ExhExhorto.estatus == "A")
+    no_modificado = await check_not_modified(request, response, database, exh_exhorto_id, consulta)
+    if no_modificado is not None:
+        return no_modificado
+
     # Consultar el exhorto
-    exh_exhorto = database.query(ExhExhorto).get(exh_exhorto_id)
+    exh_exhorto = await database.get(
+        ExhExhorto,
+        exh_exhorto_id,
+        options=[
+            *exh_exhorto_options(),
+            selectinload(ExhExhorto.exh_exhortos_partes),
+            selectinload(ExhExhorto.exh_exhortos_archivos),
+        ],
+    )
     if exh_exhorto is None:
         return OneExhExhortoOut(success=False, message="No existe ese exhorto")
     if exh_exhorto.estatus != "A":
@@ -71,20 +105,20 @@ async def detalle(
 @exh_exhortos.get("", response_model=CustomPage[ExhExhortoPaginadoOut])
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     autoridad_clave: str = "",
 ):
     """Paginado de exh_exhortos"""
     if current_user.permissions.get("EXH EXHORTOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(ExhExhorto)
+    consulta = select(ExhExhorto).options(*exh_exhorto_options())
     if autoridad_clave:
         try:
             autoridad_clave = safe_clave(autoridad_clave)
         except ValueError:
             return CustomPage(success=False, message="No es válida la clave de la autoridad")
         consulta = consulta.join(Autoridad).filter(Autoridad.clave == autoridad_clave)
-    return paginate(consulta.filter(ExhExhorto.estatus == "A").order_by(ExhExhorto.id.desc()))
+    return await apaginate_keyset(database, consulta.filter(ExhExhorto.estatus == "A"), keys=[ExhExhorto.id])
 
 
 @exh_exhortos.post("", response_model=OneExhExhortoOut)
@@ -2,107 +2,202 @@
 Listas de Acuerdos
 """
 
-from datetime import date
-from io import BytesIO
-from typing import Annotated
-from urllib.parse import unquote, urlparse
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
-from fastapi_pagination.ext.sqlalchemy import paginate
-from google.cloud import storage
+from datetime import date, datetime
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from hashids import Hashids
+from sqlalchemy import Select, select
+from sqlalchemy.orm import joinedload, undefer_group
 
-from ..config.settings import Settings, get_settings
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.blob_responses import Entrega
+from ..dependencies.conditional_requests import check_not_modified, make_local_datetime
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.documentos import deliver_document
+from ..dependencies.exports import check_export_dates, stream_export
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_changes, apaginate_keyset
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.lotes import get_by_ids, unique_ids
 from ..dependencies.safe_string import safe_clave
+from ..dependencies.sparse_fieldsets import SparseFieldset, join_relation
 from ..models.autoridades import Autoridad
 from ..models.listas_de_acuerdos import ListaDeAcuerdo
 from ..models.permisos import Permiso
-from ..schemas.listas_de_acuerdos import ListaDeAcuerdoOut, ListaDeAcuerdoRAGOut, OneListaDeAcuerdoOut
+from ..schemas.listas_de_acuerdos import (
+    ListaDeAcuerdoCambioOut,
+    ListaDeAcuerdoOut,
+    ListaDeAcuerdoRAGOut,
+    LoteListaDeAcuerdoOut,
+    LoteListasDeAcuerdosOut,
+    OneListaDeAcuerdoOut,
+)
+from ..schemas.lotes import LoteIn
+
+listas_de_acuerdos = APIRouter(prefix="/api/v5/listas_de_acuerdos", tags=["listas de acuerdos"], route_class=ModelJSONRoute)
+
+
+def lista_de_acuerdo_options() -> list:
+    """Cargar en la misma consulta, con JOIN, las relaciones que necesitan las propiedades del esquema"""
+    return [joinedload(ListaDeAcuerdo.autoridad).joinedload(Autoridad.distrito)]
+
+
+lista_de_acuerdo_fieldset = SparseFieldset(
+    ListaDeAcuerdo,
+    ListaDeAcuerdoOut,
+    {
+        "distrito_clave": "autoridad.distrito.clave",
+        "distrito_nombre": "autoridad.distrito.nombre",
+        "distrito_nombre_corto": "autoridad.distrito.nombre_corto",
+        "autoridad_clave": "autoridad.clave",
+        "autoridad_descripcion": "autoridad.descripcion",
+        "autoridad_descripcion_corta": "autoridad.descripcion_corta",
+    },
+)
+
+
+def lista_de_acuerdo_filters(
+    consulta: Select,
+    autoridad_clave: str,
+    fecha: date | None,
+    fecha_desde: date | None,
+    fecha_hasta: date | None,
+    uniones: dict[str, Any] | None = None,
+) -> Select:
+    """Filtros de los paginados y de las descargas, solo se entregan los activos, uniones son los alias de select()"""
+    if autoridad_clave:
+        try:
+            autoridad_clave = safe_clave(autoridad_clave)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
+        consulta, autoridad = join_relation(consulta, uniones, ListaDeAcuerdo.autoridad)
+        consulta = consulta.filter(autoridad.clave == autoridad_clave).filter(autoridad.estatus == "A")
+    if fecha is not None:
+        consulta = consulta.filter(ListaDeAcuerdo.fecha == fecha)
+    else:
+        if fecha_desde is not None:
+            consulta = consulta.filter(ListaDeAcuerdo.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            consulta = consulta.filter(ListaDeAcuerdo.fecha <= fecha_hasta)
+    return consulta.filter(ListaDeAcuerdo.estatus == "A")
 
-listas_de_acuerdos = APIRouter(prefix="/api/v5/listas_de_acuerdos", tags=["listas de acuerdos"])
+
+@listas_de_acuerdos.get("/cambios", response_model=CustomPage[ListaDeAcuerdoCambioOut])
+async def cambios(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    modificado_desde: datetime | None = None,
+):
+    """Listas de acuerdos creadas, modificadas o eliminadas, en orden de modificación, para mantener una copia al día"""
+    if current_user.permissions.get("LISTAS DE ACUERDOS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    consulta = select(ListaDeAcuerdo).options(*lista_de_acuerdo_options())
+    if modificado_desde is not None:
+        consulta = consulta.filter(ListaDeAcuerdo.modificado >= make_local_datetime(modificado_desde))
+    return await apaginate_changes(database, consulta, keys=[ListaDeAcuerdo.modificado, ListaDeAcuerdo.id])
+
+
+@listas_de_acuerdos.get("/export")
+async def export(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    autoridad_clave: str = "",
+    fecha: date | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    fields: str = "",
+    formato: Literal["ndjson", "csv"] = "ndjson",
+):
+    """Descargar las listas de acuerdos de una fecha o de un rango de fechas en NDJSON o CSV"""
+    if current_user.permissions.get("LISTAS DE ACUERDOS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    check_export_dates(fecha, fecha_desde, fecha_hasta)
+    campos = lista_de_acuerdo_fieldset.parse(fields) or list(ListaDeAcuerdoOut.model_fields)
+    consulta, uniones = lista_de_acuerdo_fieldset.select(campos)
+    consulta = lista_de_acuerdo_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, uniones)
+    return stream_export(consulta.order_by(ListaDeAcuerdo.id), campos, formato, "listas_de_acuerdos")
 
 
-@listas_de_acuerdos.get("/visualizar/{lista_de_acuerdo_id}")
+@listas_de_acuerdos.api_route("/visualizar/{lista_de_acuerdo_id}", methods=["GET", "HEAD"])
 async def visualizar(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
-    settings: Annotated[Settings, Depends(get_settings)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
     lista_de_acuerdo_id: int,
+    entrega: Entrega = "archivo",
 ):
-    """Visualizar el archivo de una lista de acuerdos en un iframe a partir de su ID"""
+    """Visualizar el archivo de una lista de acuerdos en un iframe a partir de su ID, o entregar su URL firmada"""
     if current_user.permissions.get("LISTAS DE ACUERDOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    lista_de_acuerdo = database.query(ListaDeAcuerdo).get(lista_de_acuerdo_id)
+    lista_de_acuerdo = await database.get(ListaDeAcuerdo, lista_de_acuerdo_id, options=lista_de_acuerdo_options())
     if lista_de_acuerdo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No existe esa lista de acuerdos")
     if lista_de_acuerdo.estatus != "A":
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No es activa esa lista de acuerdos, está eliminada")
 
-    # Validar que la URL del archivo esté definida
-    if lista_de_acuerdo.url is None or lista_de_acuerdo.url.strip() == "":
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No está definida la URL del archivo")
-
-    # Definir el blob_name a partir de lista_de_acuerdo.url, porque este contiene la ruta completa
-    url_descompuesto = urlparse(lista_de_acuerdo.url)
-    url_sin_dominio = url_descompuesto.path[1:]
-    blob_name = unquote("/".join(url_sin_dominio.split("/")[1:]))
-
-    # Obtener el archivo desde Google Cloud Storage
-    storage_client = storage.Client()
-    try:
-        bucket = storage_client.get_bucket(settings.GCP_BUCKET_LISTAS_DE_ACUERDOS)
-        blob = bucket.get_blob(blob_name)
-    except Exception as error:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"No se pudo accesar al depósito de archivos: {error}",
-        )
-
-    # Validar que el blob existe
-    if blob is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No se encontró el archivo {blob_name} en el depósito {settings.GCP_BUCKET_LISTAS_DE_ACUERDOS}",
-        )
-
-    # Descargar el archivo en memoria
-    archivo_contenido = BytesIO()
-    try:
-        archivo_contenido.write(blob.download_as_bytes())
-        archivo_contenido.seek(0)  # Volver al inicio del archivo
-    except Exception as error:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"No se pudo descargar el archivo desde el depósito: {error}",
-        )
-
     # Definir el nombre del archivo para la respuesta
     autoridad_clave = lista_de_acuerdo.autoridad.clave
     fecha_str = lista_de_acuerdo.fecha.strftime("%Y-%m-%d")
     archivo_nombre = f"lista_de_acuerdos_{autoridad_clave}_{fecha_str}.pdf"
 
-    # Entregar el archivo
-    return StreamingResponse(
-        content=archivo_contenido,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"inline; filename={archivo_nombre}"},
-    )
+    # Entregar el archivo o su URL firmada
+    return await deliver_document(request, "listas_de_acuerdos", lista_de_acuerdo.url, archivo_nombre, entrega)
+
+
+@listas_de_acuerdos.post("/lote", response_model=LoteListasDeAcuerdosOut)
+async def lote(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    lote_in: LoteIn,
+):
+    """Detalle de varias listas de acuerdos a partir de sus IDs, se consultan en una sola sentencia"""
+    if current_user.permissions.get("LISTAS DE ACUERDOS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    try:
+        ids = unique_ids(lote_in.ids)
+    except ValueError as error:
+        return LoteListasDeAcuerdosOut(success=False, message=str(error))
+    registros = await get_by_ids(database, ListaDeAcuerdo, ids, [*lista_de_acuerdo_options(), undefer_group("rag")])
+    resultados = []
+    for registro_id in ids:
+        lista_de_acuerdo = registros.get(registro_id)
+        if lista_de_acuerdo is None:
+            resultados.append(LoteListaDeAcuerdoOut(id=registro_id, success=False, message="No existe esa lista de acuerdos"))
+        elif lista_de_acuerdo.estatus != "A":
+            resultados.append(
+                LoteListaDeAcuerdoOut(
+                    id=registro_id, success=False, message="No es activa esa lista de acuerdos, está eliminada"
+                )
+            )
+        else:
+            resultados.append(
+                LoteListaDeAcuerdoOut(
+                    id=registro_id,
+                    success=True,
+                    message="Detalle de una lista de acuerdos",
+                    data=ListaDeAcuerdoRAGOut.model_validate(lista_de_acuerdo),
+                )
+            )
+    return LoteListasDeAcuerdosOut(success=True, message="Lote de listas de acuerdos", data=resultados)
 
 
 @listas_de_acuerdos.get("/{lista_de_acuerdo_id}", response_model=OneListaDeAcuerdoOut)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    response: Response,
     lista_de_acuerdo_id: int,
 ):
     """Detalle de una lista de acuerdos a partir de su ID"""
     if current_user.permissions.get("LISTAS DE ACUERDOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    lista_de_acuerdo = database.query(ListaDeAcuerdo).get(lista_de_acuerdo_id)
+    consulta = select(ListaDeAcuerdo.modificado).filter(ListaDeAcuerdo.id == lista_de_acuerdo_id, ListaDeAcuerdo.estatus == "A")
+    no_modificado = await check_not_modified(request, response, database, lista_de_acuerdo_id, consulta)
+    if no_modificado is not None:
+        return no_modificado
+    lista_de_acuerdo = await database.get(
+        ListaDeAcuerdo, lista_de_acuerdo_id, options=[*lista_de_acuerdo_options(), undefer_group("rag")]
+    )
     if lista_de_acuerdo is None:
         return OneListaDeAcuerdoOut(success=False, message="No existe esa lista de acuerdos")
     if lista_de_acuerdo.estatus != "A":
@@ -115,27 +210,23 @@ async def detalle(
 @listas_de_acuerdos.get("", response_model=CustomPage[ListaDeAcuerdoOut])
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     autoridad_clave: str = "",
     fecha: date | None = None,
     fecha_desde: date | None = None,
     fecha_hasta: date | None = None,
+    fields: str = "",
 ):
     """Paginado de listas_de_acuerdos"""
     if current_user.permissions.get("LISTAS DE ACUERDOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(ListaDeAcuerdo)
-    if autoridad_clave:
-        try:
-            autoridad_clave = safe_clave(autoridad_clave)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-        consulta = consulta.join(Autoridad).filter(Autoridad.clave == autoridad_clave).filter(Autoridad.estatus == "A")
-    if fecha is not None:
-        consulta = consulta.filter(ListaDeAcuerdo.fecha == fecha)
+    campos = lista_de_acuerdo_fieldset.parse(fields)
+    uniones = None
+    if campos is None:
+        consulta = select(ListaDeAcuerdo).options(*lista_de_acuerdo_options())
     else:
-        if fecha_desde is not None:
-            consulta = consulta.filter(ListaDeAcuerdo.fecha >= fecha_desde)
-        if fecha_hasta is not None:
-            consulta = consulta.filter(ListaDeAcuerdo.fecha <= fecha_hasta)
-    return paginate(consulta.filter(ListaDeAcuerdo.estatus == "A").order_by(ListaDeAcuerdo.id.desc()))
+        consulta, uniones = lista_de_acuerdo_fieldset.select(campos)
+    consulta = lista_de_acuerdo_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, uniones)
+    if campos is not None:
+        return await lista_de_acuerdo_fieldset.apaginate(database, consulta, campos, keys=[ListaDeAcuerdo.id])
+    return await apaginate_keyset(database, consulta, keys=[ListaDeAcuerdo.id])
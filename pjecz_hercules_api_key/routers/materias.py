@@ -5,24 +5,27 @@ Materias
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 from sqlalchemy.exc import MultipleResultsFound, NoResultFound
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.response_cache import cached_response
 from ..dependencies.safe_string import safe_clave
 from ..models.materias import Materia
 from ..models.permisos import Permiso
 from ..schemas.materias import MateriaOut, OneMateriaOut
 
-materias = APIRouter(prefix="/api/v5/materias", tags=["materias"])
+materias = APIRouter(prefix="/api/v5/materias", tags=["materias"], route_class=ModelJSONRoute)
 
 
 @materias.get("/{clave}", response_model=OneMateriaOut)
+@cached_response("MATERIAS", Materia)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     clave: str,
     distrito_clave: str = "",
 ):
@@ -34,7 +37,7 @@ async def detalle(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
     try:
-        materia = database.query(Materia).filter_by(clave=clave).one()
+        materia = (await database.execute(select(Materia).filter_by(clave=clave))).scalar_one()
     except (MultipleResultsFound, NoResultFound):
         return OneMateriaOut(success=False, message="No existe esa materia")
     if materia.estatus != "A":
@@ -43,18 +46,19 @@ async def detalle(
 
 
 @materias.get("", response_model=CustomPage[MateriaOut])
+@cached_response("MATERIAS", Materia)
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     en_sentencias: bool | None = None,
     en_exh_exhortos: bool | None = None,
 ):
     """Paginado de materias"""
     if current_user.permissions.get("MATERIAS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Materia)
+    consulta = select(Materia)
     if en_sentencias is not None:
         consulta = consulta.filter(Materia.en_sentencias == en_sentencias)
     if en_exh_exhortos is not None:
         consulta = consulta.filter(Materia.en_exh_exhortos == en_exh_exhortos)
-    return paginate(consulta.filter_by(estatus="A").order_by(Materia.nombre))
+    return await apaginate_custom(database, consulta.filter_by(estatus="A").order_by(Materia.nombre))
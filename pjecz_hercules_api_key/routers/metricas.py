@@ -0,0 +1,45 @@
+"""
+Métricas
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..dependencies.authentications import UsuarioInDB, get_auth_rejection_stats, get_current_active_user, get_user_cache_stats
+from ..dependencies.blob_cache import get_blob_cache_stats
+from ..dependencies.cloud_storage import get_storage_stats
+from ..dependencies.compression import get_compression_stats
+from ..dependencies.database import get_async_pool_stats, get_pool_stats, get_replica_stats
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.rate_limits import get_rate_limit_stats
+from ..dependencies.response_cache import get_response_cache_stats
+from ..models.permisos import Permiso
+from ..schemas.metricas import MetricasOut, OneMetricasOut
+
+metricas = APIRouter(prefix="/api/v5/metricas", tags=["metricas"], route_class=ModelJSONRoute)
+
+
+@metricas.get("", response_model=OneMetricasOut)
+async def detalle(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+):
+    """Métricas del proceso que atiende la solicitud"""
+    if current_user.permissions.get("METRICAS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return OneMetricasOut(
+        success=True,
+        message="Métricas del proceso",
+        data=MetricasOut(
+            almacenamiento=get_storage_stats(),
+            archivos_cache=get_blob_cache_stats(),
+            autentificaciones=get_auth_rejection_stats(),
+            catalogos_cache=get_response_cache_stats(),
+            compresion=get_compression_stats(),
+            pool=get_pool_stats(),
+            pool_async=get_async_pool_stats(),
+            rate_limits=get_rate_limit_stats(),
+            replica=get_replica_stats(),
+            usuarios_cache=get_user_cache_stats(),
+        ),
+    )
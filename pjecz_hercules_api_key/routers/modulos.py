@@ -5,24 +5,27 @@ Modulos
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.response_cache import cached_response
 from ..models.modulos import Modulo
 from ..models.permisos import Permiso
 from ..schemas.modulos import ModuloOut
 
-modulos = APIRouter(prefix="/api/v5/modulos", tags=["usuarios"])
+modulos = APIRouter(prefix="/api/v5/modulos", tags=["usuarios"], route_class=ModelJSONRoute)
 
 
 @modulos.get("", response_model=CustomPage[ModuloOut])
+@cached_response("MODULOS", Modulo)
 async def paginado_modulos(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
 ):
     """Paginado de módulos"""
     if current_user.permissions.get("MODULOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return paginate(database.query(Modulo).filter_by(estatus="A").order_by(Modulo.nombre))
+    return await apaginate_custom(database, select(Modulo).filter_by(estatus="A").order_by(Modulo.nombre))
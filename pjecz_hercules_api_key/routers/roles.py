@@ -5,24 +5,27 @@ Roles
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.response_cache import cached_response
 from ..models.permisos import Permiso
 from ..models.roles import Rol
 from ..schemas.roles import RolOut
 
-roles = APIRouter(prefix="/api/v5/roles", tags=["usuarios"])
+roles = APIRouter(prefix="/api/v5/roles", tags=["usuarios"], route_class=ModelJSONRoute)
 
 
 @roles.get("", response_model=CustomPage[RolOut])
+@cached_response("ROLES", Rol)
 async def paginado_roles(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
 ):
     """Paginado de roles"""
     if current_user.permissions.get("ROLES", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return paginate(database.query(Rol).filter_by(estatus="A").order_by(Rol.nombre))
+    return await apaginate_custom(database, select(Rol).filter_by(estatus="A").order_by(Rol.nombre))
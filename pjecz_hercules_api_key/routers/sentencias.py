@@ -2,35 +2,209 @@
 Sentencias
 """
 
-from datetime import date
-from typing import Annotated
+from datetime import date, datetime
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import Select, select
+from sqlalchemy.orm import joinedload, undefer_group
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.blob_responses import Entrega
+from ..dependencies.conditional_requests import check_not_modified, make_local_datetime
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.documentos import deliver_document
+from ..dependencies.exports import check_export_dates, stream_export
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_changes, apaginate_keyset
+from ..dependencies.json_responses import ModelJSONRoute
+from ..dependencies.lotes import get_by_ids, unique_ids
 from ..dependencies.safe_string import safe_clave
+from ..dependencies.sparse_fieldsets import SparseFieldset, join_relation
 from ..models.autoridades import Autoridad
 from ..models.materias_tipos_juicios import MateriaTipoJuicio
 from ..models.permisos import Permiso
 from ..models.sentencias import Sentencia
-from ..schemas.sentencias import OneSentenciaOut, SentenciaOut, SentenciaRAGOut
+from ..schemas.lotes import LoteIn
+from ..schemas.sentencias import (
+    LoteSentenciaOut,
+    LoteSentenciasOut,
+    OneSentenciaOut,
+    SentenciaCambioOut,
+    SentenciaOut,
+    SentenciaRAGOut,
+)
 
-sentencias = APIRouter(prefix="/api/v5/sentencias", tags=["sentencias"])
+sentencias = APIRouter(prefix="/api/v5/sentencias", tags=["sentencias"], route_class=ModelJSONRoute)
+
+
+def sentencia_options() -> list:
+    """Cargar en la misma consulta, con JOIN, las relaciones que necesitan las propiedades del esquema"""
+    return [
+        joinedload(Sentencia.autoridad).joinedload(Autoridad.distrito),
+        joinedload(Sentencia.materia_tipo_juicio).joinedload(MateriaTipoJuicio.materia),
+    ]
+
+
+sentencia_fieldset = SparseFieldset(
+    Sentencia,
+    SentenciaOut,
+    {
+        "distrito_clave": "autoridad.distrito.clave",
+        "distrito_nombre": "autoridad.distrito.nombre",
+        "distrito_nombre_corto": "autoridad.distrito.nombre_corto",
+        "autoridad_clave": "autoridad.clave",
+        "autoridad_descripcion": "autoridad.descripcion",
+        "autoridad_descripcion_corta": "autoridad.descripcion_corta",
+        "materia_clave": "materia_tipo_juicio.materia.clave",
+        "materia_nombre": "materia_tipo_juicio.materia.nombre",
+        "materia_tipo_juicio_descripcion": "materia_tipo_juicio.descripcion",
+    },
+)
+
+
+def sentencia_filters(
+    consulta: Select,
+    autoridad_clave: str,
+    fecha: date | None,
+    fecha_desde: date | None,
+    fecha_hasta: date | None,
+    materia_tipo_juicio_id: int | None,
+    uniones: dict[str, Any] | None = None,
+) -> Select:
+    """Filtros de los paginados y de las descargas, solo se entregan los activos, uniones son los alias de select()"""
+    if autoridad_clave:
+        try:
+            autoridad_clave = safe_clave(autoridad_clave)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
+        consulta, autoridad = join_relation(consulta, uniones, Sentencia.autoridad)
+        consulta = consulta.filter(autoridad.clave == autoridad_clave).filter(autoridad.estatus == "A")
+    if fecha is not None:
+        consulta = consulta.filter(Sentencia.fecha == fecha)
+    else:
+        if fecha_desde is not None:
+            consulta = consulta.filter(Sentencia.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            consulta = consulta.filter(Sentencia.fecha <= fecha_hasta)
+    if materia_tipo_juicio_id is not None:
+        consulta, materia_tipo_juicio = join_relation(consulta, uniones, Sentencia.materia_tipo_juicio)
+        consulta = consulta.filter(materia_tipo_juicio.id == materia_tipo_juicio_id).filter(materia_tipo_juicio.estatus == "A")
+    return consulta.filter(Sentencia.estatus == "A")
+
+
+@sentencias.get("/cambios", response_model=CustomPage[SentenciaCambioOut])
+async def cambios(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    modificado_desde: datetime | None = None,
+):
+    """Sentencias creadas, modificadas o eliminadas, en orden de modificación, para mantener una copia al día"""
+    if current_user.permissions.get("SENTENCIAS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    consulta = select(Sentencia).options(*sentencia_options())
+    if modificado_desde is not None:
+        consulta = consulta.filter(Sentencia.modificado >= make_local_datetime(modificado_desde))
+    return await apaginate_changes(database, consulta, keys=[Sentencia.modificado, Sentencia.id])
+
+
+@sentencias.get("/export")
+async def export(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    autoridad_clave: str = "",
+    fecha: date | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    fields: str = "",
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    materia_tipo_juicio_id: int | None = None,
+):
+    """Descargar las sentencias de una fecha o de un rango de fechas en NDJSON o CSV"""
+    if current_user.permissions.get("SENTENCIAS EXPORTAR", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    check_export_dates(fecha, fecha_desde, fecha_hasta)
+    campos = sentencia_fieldset.parse(fields) or list(SentenciaOut.model_fields)
+    consulta, uniones = sentencia_fieldset.select(campos)
+    consulta = sentencia_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, materia_tipo_juicio_id, uniones)
+    return stream_export(consulta.order_by(Sentencia.id), campos, formato, "sentencias")
+
+
+@sentencias.api_route("/visualizar/{sentencia_id}", methods=["GET", "HEAD"])
+async def visualizar(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    sentencia_id: int,
+    entrega: Entrega = "archivo",
+):
+    """Visualizar el archivo de una sentencia en un iframe a partir de su ID, o entregar su URL firmada"""
+    if current_user.permissions.get("SENTENCIAS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    sentencia = await database.get(Sentencia, sentencia_id, options=sentencia_options())
+    if sentencia is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No existe esa sentencia")
+    if sentencia.estatus != "A":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No es activa esa sentencia, está eliminada")
+
+    # Definir el nombre del archivo para la respuesta, varias sentencias comparten autoridad y fecha
+    autoridad_clave = sentencia.autoridad.clave
+    fecha_str = sentencia.fecha.strftime("%Y-%m-%d")
+    archivo_nombre = f"sentencia_{autoridad_clave}_{fecha_str}_{sentencia.id}.pdf"
+
+    # Entregar el archivo o su URL firmada
+    return await deliver_document(request, "sentencias", sentencia.url, archivo_nombre, entrega)
+
+
+@sentencias.post("/lote", response_model=LoteSentenciasOut)
+async def lote(
+    current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    lote_in: LoteIn,
+):
+    """Detalle de varias sentencias a partir de sus IDs, se consultan en una sola sentencia"""
+    if current_user.permissions.get("SENTENCIAS", 0) < Permiso.VER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    try:
+        ids = unique_ids(lote_in.ids)
+    except ValueError as error:
+        return LoteSentenciasOut(success=False, message=str(error))
+    registros = await get_by_ids(database, Sentencia, ids, [*sentencia_options(), undefer_group("rag")])
+    resultados = []
+    for registro_id in ids:
+        sentencia = registros.get(registro_id)
+        if sentencia is None:
+            resultados.append(LoteSentenciaOut(id=registro_id, success=False, message="No existe esa sentencia"))
+        elif sentencia.estatus != "A":
+            resultados.append(
+                LoteSentenciaOut(id=registro_id, success=False, message="No es activa esa sentencia, está eliminada")
+            )
+        else:
+            resultados.append(
+                LoteSentenciaOut(
+                    id=registro_id,
+                    success=True,
+                    message="Detalle de una sentencia",
+                    data=SentenciaRAGOut.model_validate(sentencia),
+                )
+            )
+    return LoteSentenciasOut(success=True, message="Lote de sentencias", data=resultados)
 
 
 @sentencias.get("/{sentencia_id}", response_model=OneSentenciaOut)
 async def detalle(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    request: Request,
+    response: Response,
     sentencia_id: int,
 ):
     """Detalle de una sentencia a partir de su ID"""
     if current_user.permissions.get("SENTENCIAS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    sentencia = database.query(Sentencia).get(sentencia_id)
+    consulta = select(Sentencia.modificado).filter(Sentencia.id == sentencia_id, Sentencia.estatus == "A")
+    no_modificado = await check_not_modified(request, response, database, sentencia_id, consulta)
+    if no_modificado is not None:
+        return no_modificado
+    sentencia = await database.get(Sentencia, sentencia_id, options=[*sentencia_options(), undefer_group("rag")])
     if sentencia is None:
         return OneSentenciaOut(success=False, message="No existe esa sentencia")
     if sentencia.estatus != "A":
@@ -41,34 +215,24 @@ async def detalle(
 @sentencias.get("", response_model=CustomPage[SentenciaOut])
 async def paginado(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     autoridad_clave: str = "",
     fecha: date | None = None,
     fecha_desde: date | None = None,
     fecha_hasta: date | None = None,
+    fields: str = "",
     materia_tipo_juicio_id: int | None = None,
 ):
     """Paginado de sentencias"""
     if current_user.permissions.get("SENTENCIAS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Sentencia)
-    if autoridad_clave:
-        try:
-            autoridad_clave = safe_clave(autoridad_clave)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-        consulta = consulta.join(Autoridad).filter(Autoridad.clave == autoridad_clave).filter(Autoridad.estatus == "A")
-    if fecha is not None:
-        consulta = consulta.filter(Sentencia.fecha == fecha)
+    campos = sentencia_fieldset.parse(fields)
+    uniones = None
+    if campos is None:
+        consulta = select(Sentencia).options(*sentencia_options())
     else:
-        if fecha_desde is not None:
-            consulta = consulta.filter(Sentencia.fecha >= fecha_desde)
-        if fecha_hasta is not None:
-            consulta = consulta.filter(Sentencia.fecha <= fecha_hasta)
-    if materia_tipo_juicio_id is not None:
-        consulta = (
-            consulta.join(MateriaTipoJuicio)
-            .filter(MateriaTipoJuicio.id == materia_tipo_juicio_id)
-            .filter(MateriaTipoJuicio.estatus == "A")
-        )
-    return paginate(consulta.filter(Sentencia.estatus == "A").order_by(Sentencia.id.desc()))
+        consulta, uniones = sentencia_fieldset.select(campos)
+    consulta = sentencia_filters(consulta, autoridad_clave, fecha, fecha_desde, fecha_hasta, materia_tipo_juicio_id, uniones)
+    if campos is not None:
+        return await sentencia_fieldset.apaginate(database, consulta, campos, keys=[Sentencia.id])
+    return await apaginate_keyset(database, consulta, keys=[Sentencia.id])
@@ -5,24 +5,25 @@ Usuarios
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
 from sqlalchemy.exc import MultipleResultsFound, NoResultFound
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
 from ..dependencies.safe_string import safe_email, safe_string
 from ..models.permisos import Permiso
 from ..models.usuarios import Usuario
 from ..schemas.usuarios import OneUsuarioOut, UsuarioOut
 
-usuarios = APIRouter(prefix="/api/v5/usuarios", tags=["usuarios"])
+usuarios = APIRouter(prefix="/api/v5/usuarios", tags=["usuarios"], route_class=ModelJSONRoute)
 
 
 @usuarios.get("/{email}", response_model=OneUsuarioOut)
 async def detalle_usuario(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     email: str,
 ):
     """Detalle de una usuarios a partir de su e-mail"""
@@ -33,7 +34,7 @@ async def detalle_usuario(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válido el e-mail")
     try:
-        usuario = database.query(Usuario).filter_by(email=email).one()
+        usuario = (await database.execute(select(Usuario).filter_by(email=email))).scalar_one()
     except (MultipleResultsFound, NoResultFound):
         return OneUsuarioOut(success=False, message="No existe ese usuario")
     if usuario.estatus != "A":
@@ -44,7 +45,7 @@ async def detalle_usuario(
 @usuarios.get("", response_model=CustomPage[UsuarioOut])
 async def paginado_usuarios(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     apellido_paterno: str | None = None,
     apellido_materno: str | None = None,
     email: str | None = None,
@@ -53,7 +54,7 @@ async def paginado_usuarios(
     """Paginado de usuarios"""
     if current_user.permissions.get("USUARIOS", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(Usuario)
+    consulta = select(Usuario)
     if apellido_paterno is not None:
         apellido_paterno = safe_string(apellido_paterno)
         if apellido_paterno != "":
@@ -72,4 +73,4 @@ async def paginado_usuarios(
         nombres = safe_string(nombres)
         if nombres != "":
             consulta = consulta.filter(Usuario.nombres.contains(nombres))
-    return paginate(consulta.filter(Usuario.estatus == "A").order_by(Usuario.email))
+    return await apaginate_custom(database, consulta.filter(Usuario.estatus == "A").order_by(Usuario.email))
@@ -5,11 +5,13 @@ Usuarios-Roles
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 from ..dependencies.authentications import UsuarioInDB, get_current_active_user
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..dependencies.database import AsyncSession, get_async_db
+from ..dependencies.fastapi_pagination_custom_page import CustomPage, apaginate_custom
+from ..dependencies.json_responses import ModelJSONRoute
 from ..dependencies.safe_string import safe_email
 from ..models.permisos import Permiso
 from ..models.roles import Rol
@@ -17,20 +19,20 @@ from ..models.usuarios import Usuario
 from ..models.usuarios_roles import UsuarioRol
 from ..schemas.usuarios_roles import UsuarioRolOut
 
-usuarios_roles = APIRouter(prefix="/api/v5/usuarios_roles", tags=["usuarios"])
+usuarios_roles = APIRouter(prefix="/api/v5/usuarios_roles", tags=["usuarios"], route_class=ModelJSONRoute)
 
 
 @usuarios_roles.get("", response_model=CustomPage[UsuarioRolOut])
 async def paginado_usuarios_roles(
     current_user: Annotated[UsuarioInDB, Depends(get_current_active_user)],
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     rol_id: int | None = None,
     email: str | None = None,
 ):
     """Paginado de usuarios-roles"""
     if current_user.permissions.get("USUARIOS ROLES", 0) < Permiso.VER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    consulta = database.query(UsuarioRol)
+    consulta = select(UsuarioRol).options(joinedload(UsuarioRol.rol), joinedload(UsuarioRol.usuario))
     if rol_id is not None:
         consulta = consulta.join(Rol).filter(Rol.id == rol_id).filter(Rol.estatus == "A")
     if email is not None:
@@ -39,4 +41,4 @@ async def paginado_usuarios_roles(
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válido el e-mail")
         consulta = consulta.join(Usuario).filter(Usuario.email == email).filter(Usuario.estatus == "A")
-    return paginate(consulta.filter(UsuarioRol.estatus == "A").order_by(UsuarioRol.id.desc()))
+    return await apaginate_custom(database, consulta.filter(UsuarioRol.estatus == "A").order_by(UsuarioRol.id.desc()))
@@ -0,0 +1,29 @@
+"""
+Batch, esquemas de pydantic
+"""
+
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BatchIn(BaseModel):
+    """Esquema para recibir las rutas GET de un lote de solicitudes"""
+
+    paths: list[str]
+
+
+class BatchResponseOut(BaseModel):
+    """Esquema para entregar la respuesta de una solicitud del lote"""
+
+    path: str
+    status_code: int
+    body: Any = None
+
+
+class OneBatchOut(BaseModel):
+    """Esquema para entregar las respuestas de un lote de solicitudes"""
+
+    success: bool
+    message: str
+    data: list[BatchResponseOut] = []
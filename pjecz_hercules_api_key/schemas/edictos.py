@@ -36,9 +36,30 @@ class EdictoRAGOut(EdictoOut):
     rag_categorias: dict | None = None
 
 
+class EdictoCambioOut(EdictoOut):
+    """Agregar el estatus y la modificación para cuando se entregan los cambios"""
+
+    estatus: str
+    modificado: datetime
+
+
 class OneEdictoOut(BaseModel):
     """Esquema para entregar un edicto"""
 
     success: bool
     message: str
     data: EdictoRAGOut | None = None
+
+
+class LoteEdictoOut(OneEdictoOut):
+    """Esquema para entregar un edicto de un lote"""
+
+    id: int
+
+
+class LoteEdictosOut(BaseModel):
+    """Esquema para entregar un lote de edictos"""
+
+    success: bool
+    message: str
+    data: list[LoteEdictoOut] = []
@@ -33,9 +33,30 @@ class ListaDeAcuerdoRAGOut(ListaDeAcuerdoOut):
     rag_categorias: dict | None = None
 
 
+class ListaDeAcuerdoCambioOut(ListaDeAcuerdoOut):
+    """Agregar el estatus y la modificación para cuando se entregan los cambios"""
+
+    estatus: str
+    modificado: datetime
+
+
 class OneListaDeAcuerdoOut(BaseModel):
     """Esquema para entregar una lista de acuerdos"""
 
     success: bool
     message: str
     data: ListaDeAcuerdoRAGOut | None = None
+
+
+class LoteListaDeAcuerdoOut(OneListaDeAcuerdoOut):
+    """Esquema para entregar una lista de acuerdos de un lote"""
+
+    id: int
+
+
+class LoteListasDeAcuerdosOut(BaseModel):
+    """Esquema para entregar un lote de listas de acuerdos"""
+
+    success: bool
+    message: str
+    data: list[LoteListaDeAcuerdoOut] = []
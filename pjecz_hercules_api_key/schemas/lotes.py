@@ -0,0 +1,15 @@
+"""
+Lotes, esquemas de pydantic
+"""
+
+from typing import Annotated
+
+from pydantic import BaseModel, Field
+
+from ..config.settings import get_settings
+
+
+class LoteIn(BaseModel):
+    """Esquema para recibir los IDs de un lote, si son más de LOTE_MAX_IDS se rechaza con 422"""
+
+    ids: Annotated[list[int], Field(min_length=1, max_length=get_settings().LOTE_MAX_IDS)]
@@ -0,0 +1,28 @@
+"""
+Métricas, esquemas de pydantic
+"""
+
+from pydantic import BaseModel
+
+
+class MetricasOut(BaseModel):
+    """Esquema para entregar las métricas del proceso"""
+
+    almacenamiento: dict | None = None
+    archivos_cache: dict | None = None
+    autentificaciones: dict | None = None
+    catalogos_cache: dict | None = None
+    compresion: dict | None = None
+    pool: dict
+    pool_async: dict
+    rate_limits: dict | None = None
+    replica: dict | None = None
+    usuarios_cache: dict | None = None
+
+
+class OneMetricasOut(BaseModel):
+    """Esquema para entregar las métricas"""
+
+    success: bool
+    message: str
+    data: MetricasOut | None = None
@@ -43,9 +43,30 @@ class SentenciaRAGOut(SentenciaOut):
     rag_categorias: dict | None = None
 
 
+class SentenciaCambioOut(SentenciaOut):
+    """Agregar el estatus y la modificación para cuando se entregan los cambios"""
+
+    estatus: str
+    modificado: datetime
+
+
 class OneSentenciaOut(BaseModel):
     """Esquema para entregar una sentencia"""
 
     success: bool
     message: str
     data: SentenciaRAGOut | None = None
+
+
+class LoteSentenciaOut(OneSentenciaOut):
+    """Esquema para entregar una sentencia de un lote"""
+
+    id: int
+
+
+class LoteSentenciasOut(BaseModel):
+    """Esquema para entregar un lote de sentencias"""
+
+    success: bool
+    message: str
+    data: list[LoteSentenciaOut] = []
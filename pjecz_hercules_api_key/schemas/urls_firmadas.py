@@ -0,0 +1,22 @@
+"""
+URLs Firmadas, esquemas de pydantic
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class URLFirmadaOut(BaseModel):
+    """Esquema para entregar la URL firmada de un archivo del depósito"""
+
+    url: str
+    expiracion: datetime
+
+
+class OneURLFirmadaOut(BaseModel):
+    """Esquema para entregar una URL firmada"""
+
+    success: bool
+    message: str
+    data: URLFirmadaOut | None = None
@@ -0,0 +1,89 @@
+"""
+Benchmark de la serialización de una página de 100 sentencias
+
+Compara el camino de FastAPI (validar contra el response_model, convertir a dict y json.dumps)
+con model_dump_json del esquema que ya construyó el endpoint. No requiere la base de datos.
+
+    python -m tests.benchmark_serialization
+"""
+
+import timeit
+from datetime import date, datetime
+
+from fastapi._compat import ModelField
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from pjecz_hercules_api_key.dependencies.fastapi_pagination_custom_page import CustomPage
+from pjecz_hercules_api_key.schemas.sentencias import SentenciaOut
+
+REPETICIONES = 200
+
+
+def make_page() -> CustomPage[SentenciaOut]:
+    """Página con 100 sentencias de ejemplo"""
+    sentencias = [
+        SentenciaOut(
+            id=numero,
+            distrito_clave="SLT",
+            distrito_nombre="DISTRITO JUDICIAL DE SALTILLO",
+            distrito_nombre_corto="SALTILLO",
+            autoridad_clave="SLT-J1-CIV",
+            autoridad_descripcion="JUZGADO PRIMERO DE PRIMERA INSTANCIA EN MATERIA CIVIL",
+            autoridad_descripcion_corta="JUZ. 1RO. CIVIL",
+            materia_clave="CIV",
+            materia_nombre="CIVIL",
+            materia_tipo_juicio_id=1,
+            materia_tipo_juicio_descripcion="ORDINARIO CIVIL",
+            sentencia=f"{numero}/2025",
+            sentencia_fecha=date(2025, 1, 1),
+            expediente=f"{numero}/2024",
+            expediente_anio=2024,
+            expediente_num=numero,
+            fecha=date(2025, 1, 2),
+            descripcion="SENTENCIA DEFINITIVA",
+            es_perspectiva_genero=False,
+            rag_fue_analizado_tiempo=datetime(2025, 1, 3, 12, 30),
+        )
+        for numero in range(1, 101)
+    ]
+    return CustomPage[SentenciaOut](success=True, message="Success", data=sentencias, total=100, limit=100, offset=0)
+
+
+def main():
+    """Medir y mostrar los milisegundos por página de cada camino"""
+    pagina = make_page()
+    campo: ModelField = create_model_field(name="Response", type_=CustomPage[SentenciaOut], mode="serialization")
+
+    async def fastapi_default() -> bytes:
+        contenido = await serialize_response(field=campo, response_content=pagina, is_coroutine=True)
+        return JSONResponse(contenido).body
+
+    async def fastapi_orjson() -> bytes:
+        contenido = await serialize_response(field=campo, response_content=pagina, is_coroutine=True)
+        return ORJSONResponse(contenido).body
+
+    def model_dump_json() -> bytes:
+        return pagina.model_dump_json(by_alias=True).encode("utf-8")
+
+    def run(coroutine_function):
+        coroutine = coroutine_function()
+        try:
+            coroutine.send(None)
+        except StopIteration as resultado:
+            return resultado.value
+        raise RuntimeError("La serialización no debe esperar")
+
+    caminos = {
+        "serialize_response + JSONResponse": lambda: run(fastapi_default),
+        "serialize_response + ORJSONResponse": lambda: run(fastapi_orjson),
+        "model_dump_json": model_dump_json,
+    }
+    for nombre, funcion in caminos.items():
+        segundos = min(timeit.repeat(funcion, number=REPETICIONES, repeat=5)) / REPETICIONES
+        print(f"{nombre:40} {segundos * 1000:8.3f} ms por página, {len(funcion())} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Unit tests for authentications
+"""
+
+import unittest
+
+import requests
+
+from tests import config
+
+
+class TestAuthentications(unittest.TestCase):
+    """Tests for authentications"""
+
+    def test_rejected_api_key(self):
+        """Test a rejected api_key is rejected again with the same reason"""
+
+        # Consultar dos veces con una api_key que no es válida
+        detalles = []
+        for _ in range(2):
+            try:
+                response = requests.get(
+                    f"{config['api_base_url']}/api/v5/distritos",
+                    headers={"X-Api-Key": "no.es.valida"},
+                    timeout=config["timeout"],
+                )
+            except requests.exceptions.RequestException as error:
+                self.fail(error)
+            self.assertEqual(response.status_code, 403)
+            detalles.append(response.json()["detail"])
+
+        # Validar que se rechace con el mismo motivo
+        self.assertEqual(detalles[0], detalles[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
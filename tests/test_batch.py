@@ -0,0 +1,41 @@
+"""
+Unit tests for batch
+"""
+
+import unittest
+
+import requests
+
+from tests import config
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for batch"""
+
+    def test_post_batch(self):
+        """Test POST method for batch"""
+
+        # Consultar
+        paths = ["/api/v5/distritos", "/api/v5/materias", "/api/v5/no_existe"]
+        try:
+            response = requests.post(
+                f"{config['api_base_url']}/api/v5/batch",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                json={"paths": paths},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+
+        # Validar que se tenga una respuesta por cada ruta y en el mismo orden
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertEqual([item["path"] for item in contenido["data"]], paths)
+        self.assertEqual(contenido["data"][0]["status_code"], 200)
+        self.assertEqual(contenido["data"][0]["body"]["success"], True)
+        self.assertEqual(contenido["data"][2]["status_code"], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
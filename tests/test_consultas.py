@@ -0,0 +1,151 @@
+"""
+Unit tests for consultas
+
+Estas pruebas se conectan directo a la base de datos con las variables DB_* de la API
+"""
+
+import asyncio
+import unittest
+import uuid
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from pjecz_hercules_api_key.dependencies.authentications import get_user_permissions
+from pjecz_hercules_api_key.dependencies.database import get_async_session_local, get_engine
+from pjecz_hercules_api_key.models.autoridades import Autoridad
+from pjecz_hercules_api_key.models.edictos import Edicto
+from pjecz_hercules_api_key.models.listas_de_acuerdos import ListaDeAcuerdo
+from pjecz_hercules_api_key.models.modulos import Modulo
+from pjecz_hercules_api_key.models.permisos import Permiso
+from pjecz_hercules_api_key.models.roles import Rol
+from pjecz_hercules_api_key.models.sentencias import Sentencia
+from pjecz_hercules_api_key.models.usuarios import Usuario
+from pjecz_hercules_api_key.models.usuarios_roles import UsuarioRol
+from pjecz_hercules_api_key.routers.edictos import edicto_options
+from pjecz_hercules_api_key.routers.listas_de_acuerdos import lista_de_acuerdo_options
+from pjecz_hercules_api_key.routers.sentencias import sentencia_fieldset, sentencia_options
+from pjecz_hercules_api_key.schemas.edictos import EdictoOut
+from pjecz_hercules_api_key.schemas.listas_de_acuerdos import ListaDeAcuerdoOut
+from pjecz_hercules_api_key.schemas.sentencias import SentenciaOut
+
+LIMIT = 100
+
+
+class TestConsultas(unittest.TestCase):
+    """Tests for consultas"""
+
+    def consultar_pagina(self, modelo, opciones: list, esquema) -> list:
+        """Consultar una página, serializarla y entregar las consultas ejecutadas"""
+        consultas_sql = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            consultas_sql.append(statement)
+
+        engine = get_engine()
+        event.listen(engine, "before_cursor_execute", registrar)
+        try:
+            with Session(engine) as database:
+                consulta = select(modelo).options(*opciones).filter(modelo.estatus == "A").order_by(modelo.id.desc())
+                for item in database.execute(consulta.limit(LIMIT)).scalars().all():
+                    esquema.model_validate(item)
+        finally:
+            event.remove(engine, "before_cursor_execute", registrar)
+        return consultas_sql
+
+    def test_sentencias_page_statements(self):
+        """Test a page of sentencias uses one statement without the RAG columns"""
+        consultas_sql = self.consultar_pagina(Sentencia, sentencia_options(), SentenciaOut)
+        self.assertEqual(len(consultas_sql), 1)
+
+        # Validar que no se consulten las columnas JSON de RAG
+        for columna in ["rag_analisis", "rag_sintesis", "rag_categorias"]:
+            self.assertNotIn(columna, consultas_sql[0])
+
+    def test_edictos_page_statements(self):
+        """Test a page of edictos uses one statement without the RAG columns"""
+        consultas_sql = self.consultar_pagina(Edicto, edicto_options(), EdictoOut)
+        self.assertEqual(len(consultas_sql), 1)
+
+        # Validar que no se consulten las columnas JSON de RAG
+        for columna in ["rag_analisis", "rag_sintesis", "rag_categorias"]:
+            self.assertNotIn(columna, consultas_sql[0])
+
+    def test_listas_de_acuerdos_page_statements(self):
+        """Test a page of listas de acuerdos uses one statement without the RAG columns"""
+        consultas_sql = self.consultar_pagina(ListaDeAcuerdo, lista_de_acuerdo_options(), ListaDeAcuerdoOut)
+        self.assertEqual(len(consultas_sql), 1)
+
+        # Validar que no se consulten las columnas JSON de RAG
+        for columna in ["rag_analisis", "rag_sintesis", "rag_categorias"]:
+            self.assertNotIn(columna, consultas_sql[0])
+
+    def test_sentencias_fields_statement(self):
+        """Test a page of sentencias with fields only selects those columns and the joins they need"""
+        campos = sentencia_fieldset.parse("fecha,autoridad_clave")
+        consulta, _ = sentencia_fieldset.select(campos)
+        consulta = consulta.filter(Sentencia.estatus == "A").order_by(Sentencia.id.desc())
+        with Session(get_engine()) as database:
+            filas = database.execute(consulta.limit(LIMIT)).all()
+        for fila in filas:
+            self.assertEqual(set(fila._fields), {"id", "fecha", "autoridad_clave"})
+        sql = str(consulta)
+        self.assertIn("autoridades", sql)
+        self.assertNotIn("distritos", sql)
+        self.assertNotIn("materias", sql)
+
+    def test_user_permissions(self):
+        """Test the aggregated permissions query gives the highest active level by module of the active roles"""
+        sufijo = uuid.uuid4().hex[:8].upper()
+        with Session(get_engine(), expire_on_commit=False) as database:
+            autoridad = database.execute(select(Autoridad).limit(1)).scalars().first()
+            if autoridad is None:
+                self.skipTest("No hay autoridades")
+            modulo_a = Modulo(nombre=f"PRUEBA {sufijo} A", nombre_corto="A", icono="", ruta="")
+            modulo_b = Modulo(nombre=f"PRUEBA {sufijo} B", nombre_corto="B", icono="", ruta="")
+            roles = [Rol(nombre=f"PRUEBA {sufijo} {numero}") for numero in range(3)]
+            usuario = Usuario(
+                autoridad_id=autoridad.id,
+                email=f"prueba.{sufijo.lower()}@pjecz.gob.mx",
+                email_personal="",
+                nombres="PRUEBA",
+                apellido_paterno="PERMISOS",
+                apellido_materno="",
+                curp="",
+                puesto="",
+            )
+            registros = [
+                modulo_a,
+                modulo_b,
+                *roles,
+                usuario,
+                UsuarioRol(rol=roles[0], usuario=usuario, descripcion=""),
+                UsuarioRol(rol=roles[1], usuario=usuario, descripcion=""),
+                UsuarioRol(rol=roles[2], usuario=usuario, descripcion="", estatus="B"),  # Rol inactivo
+                Permiso(rol=roles[0], modulo=modulo_a, nombre=f"PRUEBA {sufijo} 0 A", nivel=Permiso.MODIFICAR),
+                Permiso(rol=roles[0], modulo=modulo_b, nombre=f"PRUEBA {sufijo} 0 B", nivel=Permiso.ADMINISTRAR, estatus="B"),
+                Permiso(rol=roles[1], modulo=modulo_a, nombre=f"PRUEBA {sufijo} 1 A", nivel=Permiso.CREAR),
+                Permiso(rol=roles[1], modulo=modulo_b, nombre=f"PRUEBA {sufijo} 1 B", nivel=Permiso.VER),
+                Permiso(rol=roles[2], modulo=modulo_a, nombre=f"PRUEBA {sufijo} 2 A", nivel=Permiso.ADMINISTRAR),
+            ]
+            database.add_all(registros)
+            database.commit()
+
+        def borrar():
+            with Session(get_engine()) as database:
+                for modelo in [Permiso, UsuarioRol, Usuario, Rol, Modulo]:
+                    ids = [registro.id for registro in registros if isinstance(registro, modelo)]
+                    database.execute(delete(modelo).where(modelo.id.in_(ids)))
+                database.commit()
+
+        self.addCleanup(borrar)
+
+        async def consultar() -> dict:
+            async with get_async_session_local()() as database:
+                return await get_user_permissions(usuario.id, database)
+
+        self.assertEqual(asyncio.run(consultar()), {modulo_a.nombre: Permiso.CREAR, modulo_b.nombre: Permiso.VER})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -45,6 +45,21 @@ class TestDistritos(unittest.TestCase):
             self.assertEqual("es_distrito" in item, True)
             self.assertEqual("es_jurisdiccional" in item, True)
 
+    def test_get_distritos_by_cursor(self):
+        """Test GET method for distritos with cursor, the catalogs only paginate by offset"""
+
+        # Consultar
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/distritos",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"cursor": ""},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
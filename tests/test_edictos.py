@@ -54,6 +54,40 @@ class TestEdictos(unittest.TestCase):
             self.assertEqual("rag_fue_sintetizado_tiempo" in item, True)
             self.assertEqual("rag_fue_categorizado_tiempo" in item, True)
 
+    def test_visualizar_edicto_range(self):
+        """Test GET method for visualizar an edicto with a Range header"""
+
+        # Consultar un edicto
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/edictos",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"limit": 1},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        if len(response.json()["data"]) == 0:
+            self.skipTest("No hay edictos")
+        edicto_id = response.json()["data"][0]["id"]
+
+        # Consultar los primeros 1024 bytes del archivo
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/edictos/visualizar/{edicto_id}",
+                headers={"X-Api-Key": config["api_key"], "Range": "bytes=0-1023"},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 404:
+            self.skipTest("No está el archivo en el depósito")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"].startswith("bytes 0-"), True)
+        self.assertEqual(len(response.content), int(response.headers["Content-Length"]))
+        self.assertEqual(response.content[:4], b"%PDF")
+
 
 if __name__ == "__main__":
     unittest.main()
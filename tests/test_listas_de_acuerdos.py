@@ -51,6 +51,76 @@ class TestListasDeAcuerdos(unittest.TestCase):
             self.assertEqual("rag_fue_sintetizado_tiempo" in item, True)
             self.assertEqual("rag_fue_categorizado_tiempo" in item, True)
 
+    def test_visualizar_lista_de_acuerdos_range(self):
+        """Test GET method for visualizar a lista de acuerdos with a Range header"""
+
+        # Consultar una lista de acuerdos
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/listas_de_acuerdos",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"limit": 1},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        if len(response.json()["data"]) == 0:
+            self.skipTest("No hay listas de acuerdos")
+        lista_de_acuerdo_id = response.json()["data"][0]["id"]
+
+        # Consultar los primeros 1024 bytes del archivo
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/listas_de_acuerdos/visualizar/{lista_de_acuerdo_id}",
+                headers={"X-Api-Key": config["api_key"], "Range": "bytes=0-1023"},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 404:
+            self.skipTest("No está el archivo en el depósito")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"].startswith("bytes 0-"), True)
+        self.assertEqual(len(response.content), int(response.headers["Content-Length"]))
+        self.assertEqual(response.content[:4], b"%PDF")
+
+    def test_visualizar_lista_de_acuerdos_url_firmada(self):
+        """Test GET method for visualizar a lista de acuerdos as a signed URL"""
+
+        # Consultar una lista de acuerdos
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/listas_de_acuerdos",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"limit": 1},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        if len(response.json()["data"]) == 0:
+            self.skipTest("No hay listas de acuerdos")
+        lista_de_acuerdo_id = response.json()["data"][0]["id"]
+
+        # Consultar la URL firmada del archivo
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/listas_de_acuerdos/visualizar/{lista_de_acuerdo_id}",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"entrega": "url"},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 404:
+            self.skipTest("No está el archivo en el depósito")
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertEqual("url" in contenido["data"], True)
+        self.assertEqual("expiracion" in contenido["data"], True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+"""
+Unit tests for metricas
+"""
+
+import unittest
+
+import requests
+
+from tests import config
+
+
+class TestMetricas(unittest.TestCase):
+    """Tests for metricas"""
+
+    def test_get_metricas(self):
+        """Test GET method for metricas"""
+
+        # Consultar
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/metricas",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+
+        # Validar el contenido de la respuesta
+        contenido = response.json()
+        self.assertEqual("success" in contenido, True)
+        self.assertEqual("message" in contenido, True)
+        self.assertEqual("data" in contenido, True)
+
+        # Validar que se haya tenido éxito
+        self.assertEqual(contenido["success"], True)
+
+        # Validar las estadísticas del pool de conexiones
+        self.assertEqual(type(contenido["data"]), dict)
+        self.assertEqual("pool" in contenido["data"], True)
+        pool = contenido["data"]["pool"]
+        self.assertEqual("size" in pool, True)
+        self.assertEqual("checked_in" in pool, True)
+        self.assertEqual("checked_out" in pool, True)
+        self.assertEqual("overflow" in pool, True)
+        self.assertEqual("pool_async" in contenido["data"], True)
+
+        # Validar las estadísticas del cache de usuarios, esta consulta ya fue autentificada
+        self.assertEqual("usuarios_cache" in contenido["data"], True)
+        self.assertGreaterEqual(contenido["data"]["usuarios_cache"]["misses"], 1)
+
+        # Validar las estadísticas de los límites de solicitudes
+        self.assertEqual("rate_limits" in contenido["data"], True)
+
+        # Validar las estadísticas de las respuestas de catálogos guardadas
+        self.assertEqual("catalogos_cache" in contenido["data"], True)
+
+        # Validar las estadísticas de compresión por ruta
+        self.assertEqual("compresion" in contenido["data"], True)
+
+        # Validar las estadísticas de las llamadas al depósito de archivos
+        self.assertEqual("almacenamiento" in contenido["data"], True)
+        self.assertEqual("operations" in contenido["data"]["almacenamiento"], True)
+
+        # Validar las estadísticas del cache de archivos
+        self.assertEqual("archivos_cache" in contenido["data"], True)
+        self.assertEqual("enabled" in contenido["data"]["archivos_cache"], True)
+
+
+if __name__ == "__main__":
+    unittest.main()
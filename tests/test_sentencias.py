@@ -2,6 +2,7 @@
 Unit tests for sentencias
 """
 
+import json
 import unittest
 
 import requests
@@ -57,6 +58,281 @@ class TestSentencias(unittest.TestCase):
             self.assertEqual("rag_fue_sintetizado_tiempo" in item, True)
             self.assertEqual("rag_fue_categorizado_tiempo" in item, True)
 
+    def test_get_sentencias_by_cursor(self):
+        """Test GET method for sentencias paginated by cursor"""
+
+        # Consultar la primera página por cursor
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"cursor": "", "limit": 10},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertEqual("next_cursor" in contenido, True)
+        primera_pagina = [item["id"] for item in contenido["data"]]
+
+        # Si hay página siguiente, consultarla y validar que continúe en orden descendente
+        if contenido["next_cursor"] is not None:
+            try:
+                response = requests.get(
+                    f"{config['api_base_url']}/api/v5/sentencias",
+                    headers={"X-Api-Key": config["api_key"]},
+                    timeout=config["timeout"],
+                    params={"cursor": contenido["next_cursor"], "limit": 10},
+                )
+            except requests.exceptions.RequestException as error:
+                self.fail(error)
+            self.assertEqual(response.status_code, 200)
+            contenido = response.json()
+            self.assertEqual(contenido["success"], True)
+            for item in contenido["data"]:
+                self.assertLess(item["id"], primera_pagina[-1])
+
+    def test_get_sentencias_without_total(self):
+        """Test GET method for sentencias without total and with estimated total"""
+
+        # Sin total no se hace el conteo
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"include_total": False},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertEqual(contenido["total"], None)
+
+        # Con el total estimado se indica el tipo de total
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"total_mode": "estimate"},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertIn(contenido["total_type"], ["estimate", "cached"])
+
+    def test_get_sentencia_not_modified(self):
+        """Test GET method for a sentencia with If-None-Match"""
+
+        # Consultar la primera sentencia
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"limit": 1},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        if len(contenido["data"]) == 0:
+            self.skipTest("No hay sentencias")
+        sentencia_id = contenido["data"][0]["id"]
+
+        # Consultar el detalle y validar que entregue ETag
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias/{sentencia_id}",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual("ETag" in response.headers, True)
+
+        # Consultar de nuevo con If-None-Match y validar que entregue 304 sin contenido
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias/{sentencia_id}",
+                headers={"X-Api-Key": config["api_key"], "If-None-Match": response.headers["ETag"]},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_get_sentencias_with_fields(self):
+        """Test GET method for sentencias with only some fields"""
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"fields": "fecha,autoridad_clave,descripcion"},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        for item in contenido["data"]:
+            self.assertEqual(set(item.keys()), {"id", "fecha", "autoridad_clave", "descripcion"})
+
+    def test_get_sentencias_with_unknown_fields(self):
+        """Test GET method for sentencias with a field that does not exist"""
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"fields": "no_existe"},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_sentencias(self):
+        """Test GET method for export sentencias as NDJSON"""
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias/export",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"fecha_desde": "2025-01-01", "fecha_hasta": "2025-01-31", "fields": "fecha,autoridad_clave"},
+                stream=True,
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 403:
+            self.skipTest("El usuario no tiene permiso para exportar sentencias")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        for linea in response.iter_lines():
+            item = json.loads(linea)
+            self.assertEqual(set(item.keys()), {"id", "fecha", "autoridad_clave"})
+
+    def test_post_sentencias_lote(self):
+        """Test POST method for a lote of sentencias"""
+        try:
+            response = requests.post(
+                f"{config['api_base_url']}/api/v5/sentencias/lote",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                json={"ids": [1, 2, 0]},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertEqual(contenido["success"], True)
+        self.assertEqual([item["id"] for item in contenido["data"]], [1, 2, 0])
+        self.assertEqual(contenido["data"][2]["success"], False)
+
+    def test_post_sentencias_lote_too_many_ids(self):
+        """Test POST method for a lote of sentencias with more IDs than allowed"""
+        try:
+            response = requests.post(
+                f"{config['api_base_url']}/api/v5/sentencias/lote",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                json={"ids": list(range(1, 10002))},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 422)
+
+    def test_get_sentencias_cambios(self):
+        """Test GET method for the changes of sentencias in order of modification"""
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias/cambios",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+                params={"modificado_desde": "2025-01-01T00:00:00", "limit": 10},
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 403:
+            self.skipTest("El usuario no tiene permiso para consultar los cambios de sentencias")
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        claves = [(item["modificado"], item["id"]) for item in contenido["data"]]
+        self.assertEqual(claves, sorted(claves))
+        if len(claves) > 0:
+            self.assertEqual(contenido["next_cursor"] is not None, True)
+
+    def test_get_sentencias_cambios_past_the_end(self):
+        """Test GET method for the changes of sentencias gives back the same cursor after the last change"""
+        parametros = {"modificado_desde": "2025-01-01T00:00:00", "limit": 100}
+        cursor = None
+        for _ in range(20):
+            try:
+                response = requests.get(
+                    f"{config['api_base_url']}/api/v5/sentencias/cambios",
+                    headers={"X-Api-Key": config["api_key"]},
+                    timeout=config["timeout"],
+                    params={**parametros, "cursor": cursor} if cursor else parametros,
+                )
+            except requests.exceptions.RequestException as error:
+                self.fail(error)
+            if response.status_code == 403:
+                self.skipTest("El usuario no tiene permiso para consultar los cambios de sentencias")
+            self.assertEqual(response.status_code, 200)
+            contenido = response.json()
+            if len(contenido["data"]) == 0:
+                break
+            cursor = contenido["next_cursor"]
+        else:
+            self.skipTest("Hay demasiados cambios para llegar al final")
+        if cursor is None:
+            self.skipTest("No hay cambios de sentencias")
+
+        # Al pasar del final se recibe el mismo cursor para consultar después desde ahí
+        self.assertEqual(contenido["success"], False)
+        self.assertEqual(contenido["next_cursor"], cursor)
+
+    def test_visualizar_sentencia_range(self):
+        """Test GET method for visualizar a sentencia with a Range header"""
+
+        # Consultar una sentencia
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"limit": 1},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        self.assertEqual(response.status_code, 200)
+        if len(response.json()["data"]) == 0:
+            self.skipTest("No hay sentencias")
+        sentencia_id = response.json()["data"][0]["id"]
+
+        # Consultar los primeros 1024 bytes del archivo
+        try:
+            response = requests.get(
+                f"{config['api_base_url']}/api/v5/sentencias/visualizar/{sentencia_id}",
+                headers={"X-Api-Key": config["api_key"], "Range": "bytes=0-1023"},
+                timeout=config["timeout"],
+            )
+        except requests.exceptions.RequestException as error:
+            self.fail(error)
+        if response.status_code == 404:
+            self.skipTest("No está el archivo en el depósito")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"].startswith("bytes 0-"), True)
+        self.assertEqual(len(response.content), int(response.headers["Content-Length"]))
+        self.assertEqual(response.content[:4], b"%PDF")
+
 
 if __name__ == "__main__":
     unittest.main()